@@ -0,0 +1,112 @@
+"""What logging costs a scrape, with `export.py`'s logging setup
+
+With the same handlers `export.py` attaches (a stream handler and a file
+handler, both at INFO, same format), times:
+
+- scrape: `players_generator()` + `get_team()` against the fixture replay
+  server
+- parse: the same pages' player parsing alone, without the network (which
+  is what the per-row logging slows down)
+
+and reports how many bytes of log each scrape writes.
+
+Usage:
+
+    python -m benchmarks.export_logging [--runs N] [--players N]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from fantasyfootball.espn import ESPNTeam
+from fantasyfootball.fixtures import get_fixture_key, ReplayServer
+
+from benchmarks import synthetic
+
+
+FORMAT = '%(asctime)s [%(levelname)s] %(name)s (%(process)d): %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def add_handlers(logger, directory):
+    """`export.py`'s handlers, with the stream one going to /dev/null
+    """
+    formatter = logging.Formatter(FORMAT, DATE_FORMAT)
+    stream = open(os.devnull, 'w')
+    log_filename = os.path.join(directory, 'export.log')
+    handlers = [logging.StreamHandler(stream),
+                logging.FileHandler(log_filename)]
+    for handler in handlers:
+        handler.setLevel(logging.INFO)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return handlers, stream, log_filename
+
+
+def parse_pages(team, pages, team_page):
+    players_seen = set()
+    num_players = 0
+    for offset, content in pages:
+        players, _ = team._new_players_from_rows(
+            offset, team._parse_player_rows(content), players_seen)
+        num_players += len(players)
+    return num_players + len(team._parse_team_page(team_page))
+
+
+def format_timings(timings):
+    return "best %7.1f ms/run, median %7.1f ms/run" % (
+        min(timings) * 1000, sorted(timings)[len(timings) // 2] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--players', type=int, default=600)
+    parser.add_argument('--parser', default='lxml-stream')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    logger = logging.getLogger('')
+    logger.setLevel(logging.INFO)
+    handlers, stream, log_filename = add_handlers(logger, directory)
+    fixtures = synthetic.get_fixtures(args.players)
+    try:
+        with ReplayServer(fixtures) as server:
+            team = ESPNTeam(synthetic.LEAGUE_ID, synthetic.TEAM_ID,
+                            synthetic.SEASON_ID, parser=args.parser)
+            team.set_cookie('')
+            team.session.proxies = {'http': server.url}
+            timings = []
+            for _ in range(args.runs):
+                start = time.time()
+                num_players = sum(1 for _ in team.players_generator())
+                num_players += len(team.get_team())
+                timings.append(time.time() - start)
+        for handler in handlers:
+            handler.flush()
+        log_bytes = os.path.getsize(log_filename)
+        pages = [(offset, fixtures[get_fixture_key(team._get_players_url(offset))])
+                 for offset in range(0, args.players + 50, 50)]
+        team_page = fixtures[get_fixture_key(team._get_team_url())]
+        parse_timings = []
+        for _ in range(args.runs):
+            start = time.time()
+            parse_pages(team, pages, team_page)
+            parse_timings.append(time.time() - start)
+    finally:
+        for handler in handlers:
+            logger.removeHandler(handler)
+            handler.close()
+        stream.close()
+        shutil.rmtree(directory)
+    print("%d players/run, %d log bytes/run (x2 handlers)" % (
+        num_players, log_bytes / args.runs))
+    print("scrape: %s" % format_timings(timings))
+    print("parse:  %s" % format_timings(parse_timings))
+
+
+if __name__ == '__main__':
+    main()
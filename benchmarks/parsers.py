@@ -0,0 +1,76 @@
+"""Parse time per page for each `fantasyfootball.parsers` backend
+
+Usage:
+
+    python -m benchmarks.parsers [saved_page.html ...]
+
+With no arguments, a synthetic free-agency page is used.
+"""
+
+import argparse
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+from fantasyfootball.espn import ESPNTeam
+from fantasyfootball.parsers import PARSERS
+
+from benchmarks import synthetic
+
+
+def parse_players(team, content):
+    return list(team._players_from_rows(team.parser.player_rows(content)))
+
+
+def peak_memory(team, content):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        parse_players(team, content)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('pages', nargs='*', help="Saved free-agency pages")
+    parser.add_argument('-n', '--number', type=int, default=20,
+                        help="Parses per backend per page")
+    args = parser.parse_args()
+    if args.pages:
+        pages = []
+        for filename in args.pages:
+            with open(filename, 'rb') as fp:
+                pages.append((filename, fp.read()))
+    else:
+        pages = [('synthetic', synthetic.players_page())]
+    for name, content in pages:
+        print("%s (%d bytes)" % (name, len(content)))
+        expected = None
+        for backend in sorted(PARSERS):
+            team = ESPNTeam(None, None, None, parser=backend)
+            players = parse_players(team, content)
+            if expected is None:
+                expected = players
+            elif players != expected:
+                raise AssertionError("Backend `%s` disagrees on %s" %
+                                     (backend, name))
+            seconds = min(timeit.repeat(lambda: parse_players(team, content),
+                                        repeat=3,
+                                        number=args.number)) / args.number
+            peak = peak_memory(team, content)
+            peak_str = peak is not None and "%8.1f KiB peak" % (peak / 1024.0) or ""
+            print("  %-12s %8.2f ms/page  %s  (%d players)" % (backend,
+                                                               seconds * 1000,
+                                                               peak_str,
+                                                               len(players)))
+
+
+if __name__ == '__main__':
+    main()
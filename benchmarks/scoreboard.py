@@ -0,0 +1,66 @@
+"""Scoreboard parse time per page for each `fantasyfootball.parsers` backend
+
+Times building the tree and extracting the matchups from it separately, as
+`get_scoreboard()` does them.
+
+Usage:
+
+    python -m benchmarks.scoreboard [--teams N] [saved_scoreboard.html ...]
+
+With no pages given, a synthetic scoreboard for a `--teams` (12) team league
+is used.
+"""
+
+import argparse
+import timeit
+
+from fantasyfootball.espn import ESPNTeam
+from fantasyfootball.parsers import PARSERS
+
+from benchmarks import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('pages', nargs='*', help="Saved scoreboard pages")
+    parser.add_argument('--teams', type=int, default=12,
+                        help="Teams in the synthetic league")
+    parser.add_argument('-n', '--number', type=int, default=20,
+                        help="Parses per backend per page")
+    args = parser.parse_args()
+    if args.pages:
+        pages = []
+        for filename in args.pages:
+            with open(filename, 'rb') as fp:
+                pages.append((filename, fp.read()))
+    else:
+        pages = [('synthetic, %d teams' % args.teams,
+                  synthetic.scoreboard_page(args.teams))]
+    for name, content in pages:
+        print("%s (%d bytes)" % (name, len(content)))
+        expected = None
+        for backend in sorted(PARSERS):
+            team = ESPNTeam(None, None, None, parser=backend)
+            soup = team.parser.soup(content)
+            matchups = team._parse_scoreboard(soup)
+            if expected is None:
+                expected = matchups
+            elif matchups != expected:
+                raise AssertionError("Backend `%s` disagrees on %s" %
+                                     (backend, name))
+            soup_seconds = min(timeit.repeat(lambda: team.parser.soup(content),
+                                             repeat=3,
+                                             number=args.number))
+            matchups_seconds = min(timeit.repeat(
+                lambda: team._parse_scoreboard(soup),
+                repeat=3,
+                number=args.number))
+            print("  %-12s %8.2f ms/page tree  %8.2f ms/page matchups  "
+                  "(%d matchups)" % (backend,
+                                     soup_seconds * 1000 / args.number,
+                                     matchups_seconds * 1000 / args.number,
+                                     len(matchups)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""End-to-end scraper benchmarks against a local fixture replay server
+
+Runs `players_generator()`, `get_team()` and `get_scoreboard()` for each
+parser backend against `fantasyfootball.fixtures.ReplayServer` (synthetic
+fixtures by default), each in a fresh process so its peak RSS is its own.
+Reports pages/s, players/s (teams/s for the scoreboard), parse ms/page
+(parsing only, no network) and peak RSS, saves the results to
+`benchmarks/results/` and compares them with the previous saved run. Results
+depend on the machine, so they aren't committed: each checkout builds its own
+history.
+
+Usage:
+
+    python -m benchmarks.scraper [--fixtures DIR] [--latency S] [--parser P] [--no-save]
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+from fantasyfootball.espn import ESPNTeam
+from fantasyfootball.fixtures import get_fixture_key, load_fixtures, ReplayServer
+from fantasyfootball.parsers import PARSERS
+
+from benchmarks import synthetic
+
+
+BENCHMARKS = ('players_generator', 'get_team', 'get_scoreboard')
+METRICS = ('pages_per_second', 'players_per_second', 'parse_ms_per_page',
+           'peak_rss_kib')
+# Lower is better for these, higher for the rest
+METRICS_LOWER_IS_BETTER = ('parse_ms_per_page', 'peak_rss_kib')
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'results')
+# Relative change flagged as a regression - timings on a busy machine easily
+# move 10-20% from run to run
+REGRESSION_THRESHOLD = 0.25
+# Parse timings are the best of this many runs over the benchmark's pages
+PARSE_REPEAT = 5
+
+
+def get_peak_rss_kib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Bytes on macOS, KiB everywhere else
+        peak /= 1024
+    return peak
+
+
+def get_team(parser, server):
+    team = ESPNTeam(synthetic.LEAGUE_ID, synthetic.TEAM_ID, synthetic.SEASON_ID,
+                    parser=parser)
+    team.set_cookie('')
+    team.session.proxies = {'http': server.url}
+    return team
+
+
+def time_parsing(team, benchmark, fixtures):
+    """Seconds per page spent parsing the pages `benchmark` fetches (best
+    of `PARSE_REPEAT` runs)
+    """
+    if benchmark == 'players_generator':
+        pages = [content for key, content in fixtures.items()
+                 if 'startIndex=' in key]
+        parse = lambda content: list(team._players_from_rows(
+            team.parser.player_rows(content)))
+    elif benchmark == 'get_team':
+        pages = [fixtures[get_fixture_key(team._get_team_url())]]
+        parse = team._parse_team_page
+    else:
+        pages = [fixtures[get_fixture_key(team._get_scoreboard_url())]]
+        parse = lambda content: team._parse_scoreboard(
+            team.parser.soup(content))
+    seconds = min(timeit.repeat(lambda: [parse(content) for content in pages],
+                                repeat=PARSE_REPEAT,
+                                number=1))
+    return seconds / len(pages)
+
+
+def run_benchmark(task):
+    """Runs one benchmark - in its own process, see `main()`
+    """
+    benchmark, parser, fixtures, latency, concurrency = task
+    with ReplayServer(fixtures, latency=latency) as server:
+        team = get_team(parser, server)
+        start = time.time()
+        if benchmark == 'players_generator':
+            num_players = sum(1 for _ in
+                              team.players_generator(concurrency=concurrency))
+        elif benchmark == 'get_team':
+            num_players = len(team.get_team())
+        else:
+            num_players = sum(len(matchup) for matchup in team.get_scoreboard())
+        seconds = time.time() - start
+        num_pages = server.num_requests
+    parse_seconds = time_parsing(team, benchmark, fixtures)
+    return {
+        'benchmark': benchmark,
+        'parser': parser,
+        'pages': num_pages,
+        'players': num_players,
+        'seconds': seconds,
+        'pages_per_second': num_pages / seconds,
+        'players_per_second': num_players / seconds,
+        'parse_ms_per_page': parse_seconds * 1000,
+        'peak_rss_kib': get_peak_rss_kib(),
+    }
+
+
+def run_isolated(task):
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply(run_benchmark, (task,))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_previous_results():
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    filenames = sorted(name for name in os.listdir(RESULTS_DIR)
+                       if name.endswith('.json'))
+    if not filenames:
+        return None
+    with open(os.path.join(RESULTS_DIR, filenames[-1]), 'r') as fp:
+        return json.load(fp)
+
+
+def compare(previous, result):
+    """`{metric: change}` against the matching previous result (`change` is
+    relative; positive means better)
+    """
+    changes = {}
+    for metric in METRICS:
+        old, new = previous.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / float(old)
+        if metric in METRICS_LOWER_IS_BETTER:
+            change = -change
+        changes[metric] = change
+    return changes
+
+
+def print_result(result, changes, threshold=REGRESSION_THRESHOLD):
+    print("%-18s %-12s %7.1f pages/s %9.1f players/s %8.2f ms/page %8s KiB"
+          % (result['benchmark'],
+             result['parser'],
+             result['pages_per_second'],
+             result['players_per_second'],
+             result['parse_ms_per_page'],
+             result['peak_rss_kib']))
+    regressions = ["%s %+.0f%%" % (metric, change * 100)
+                   for metric, change in sorted(changes.items())
+                   if change < -threshold]
+    if regressions:
+        print("    REGRESSION vs previous run: %s" % ', '.join(regressions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fixtures',
+                        help="Fixture set to replay (default: synthetic)")
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="Seconds before each response")
+    parser.add_argument('--concurrency', type=int,
+                        help="Pages in flight for players_generator()")
+    parser.add_argument('--parser', action='append', dest='parsers',
+                        choices=sorted(PARSERS),
+                        help="Parser backend(s) (default: all)")
+    parser.add_argument('--threshold', type=float,
+                        default=REGRESSION_THRESHOLD,
+                        help="Relative change flagged as a regression")
+    parser.add_argument('--no-save', action='store_true',
+                        help="Don't save the results")
+    args = parser.parse_args()
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        fixtures = synthetic.get_fixtures()
+    previous = get_previous_results()
+    previous_results = {}
+    # Only comparable when run the same way
+    if previous and previous.get('latency') == args.latency and \
+            previous.get('python') == platform.python_version() and \
+            previous.get('fixtures') == (args.fixtures or 'synthetic'):
+        previous_results = dict(((result['benchmark'], result['parser']),
+                                 result)
+                                for result in previous['results'])
+    results = []
+    for benchmark in BENCHMARKS:
+        for backend in args.parsers or sorted(PARSERS):
+            result = run_isolated((benchmark, backend, fixtures, args.latency,
+                                   args.concurrency))
+            previous_result = previous_results.get((benchmark, backend))
+            changes = previous_result and compare(previous_result, result) or {}
+            print_result(result, changes, args.threshold)
+            results.append(result)
+    if args.no_save:
+        return
+    if not os.path.isdir(RESULTS_DIR):
+        os.makedirs(RESULTS_DIR)
+    now = datetime.datetime.now()
+    filename = os.path.join(RESULTS_DIR,
+                            'scraper-%s.json' % now.strftime('%Y-%m-%d-%H-%M-%S'))
+    with open(filename, 'w') as fp:
+        json.dump({
+            'created_at': now.isoformat(),
+            'git_revision': get_git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixtures': args.fixtures or 'synthetic',
+            'latency': args.latency,
+            'concurrency': args.concurrency,
+            'results': results,
+        }, fp, indent=2, sort_keys=True)
+    print("Saved to %s" % filename)
+
+
+if __name__ == '__main__':
+    main()
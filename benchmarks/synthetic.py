@@ -0,0 +1,253 @@
+"""Synthetic ESPN pages, shaped like the real thing, for benchmarking without
+live credentials
+"""
+
+from fantasyfootball.espn import ESPNTeam
+from fantasyfootball.fixtures import get_fixture_key
+
+
+TEAMS = ['NYJ', 'Buf', 'NE', 'Mia', 'Pit', 'Bal', 'Cin', 'Cle']
+POSITIONS = ['QB', 'RB', 'WR', 'TE', 'K']
+DST_NAMES = ['Jets', 'Bills', 'Patriots', 'Dolphins', 'Steelers', 'Ravens',
+             'Bengals', 'Browns', 'Texans', 'Colts', 'Jaguars', 'Titans',
+             'Broncos', 'Chiefs', 'Raiders', 'Chargers', 'Giants', 'Eagles',
+             'Cowboys', 'Redskins', 'Bears', 'Lions', 'Packers', 'Vikings',
+             'Falcons', 'Panthers', 'Saints', 'Buccaneers', 'Cardinals',
+             'Rams', '49ers', 'Seahawks']
+
+# Roughly what surrounds the player table on a real page: nav, scripts, ads
+PAGE_TEMPLATE = u"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Free Agency - ESPN Fantasy Football</title>
+%(scripts)s
+</head>
+<body>
+<div id="global-nav">%(nav)s</div>
+<div class="ad-slot" id="ad-banner"><iframe src="about:blank"></iframe></div>
+<table id="playertable_0" class="playerTableTable tableBody">
+<tr class="playerTableBgRowHead tableHead playertableSectionHeader">
+<th colspan="18">PLAYERS</th>
+</tr>
+%(rows)s
+</table>
+<div id="footer">%(nav)s</div>
+</body>
+</html>
+"""
+
+
+def _scripts():
+    return u'\n'.join(
+        u'<script type="text/javascript">var espn_%d = {"a": [1, 2, 3], "b": "<div>%d</div>"};</script>' % (i, i)
+        for i in range(40))
+
+
+def _nav():
+    return u''.join(u'<ul class="nav-%d">%s</ul>' % (i, u''.join(
+        u'<li><a href="/ffl/page%d-%d">Link %d</a></li>' % (i, j, j)
+        for j in range(15))) for i in range(10))
+
+
+def ordinal(number):
+    """`1st`, `2nd`, `28th`: how ESPN shows OPRK
+    """
+    if number % 100 in (11, 12, 13):
+        suffix = u'th'
+    else:
+        suffix = {1: u'st', 2: u'nd', 3: u'rd'}.get(number % 10, u'th')
+    return u'%d%s' % (number, suffix)
+
+
+def player_info(index):
+    if index % 17 == 5 and index // 17 < len(DST_NAMES):
+        return u'%s D/ST D/ST' % DST_NAMES[index // 17]
+    status = u' Q' if index % 9 == 0 else u''
+    return u'Player%d Lastname%d, %s %s%s' % (
+        index, index, TEAMS[index % len(TEAMS)],
+        POSITIONS[index % len(POSITIONS)], status)
+
+
+def owner(index):
+    """`FA`, on waivers, or one of 12 teams - one of them `WALT`, which
+    isn't on waivers
+    """
+    if index % 6 == 3:
+        return u'WA (Wed)'
+    if index % 3 == 0:
+        return u'FA'
+    if index % 12 == 1:
+        return u'<a href="#">WALT</a>'
+    return u'<a href="#">OWN%d</a>' % (index % 12)
+
+
+def player_row(index, offset_cols=0):
+    """Free-agency row: 18 `<td>`s, 17 when the player's team is on a bye
+    """
+    bye = index % 13 == 0
+    if bye:
+        opp = u'** BYE **'
+    elif index % 2:
+        opp = u'<a href="#">@%s</a>' % TEAMS[(index + 1) % len(TEAMS)]
+    else:
+        opp = u'<a href="#">%s</a>' % TEAMS[(index + 3) % len(TEAMS)]
+    cols = [u'<a href="#" playerid="%d">%s</a>' % (index, player_info(index)),
+            u'',
+            owner(index),
+            u'',
+            u'',
+            opp]
+    if not bye:
+        cols.append(u'<a href="#">Sun 1:00</a>')
+    cols += [u'',
+             u'%d' % index,
+             u'%d.0' % (index * 3),
+             u'%0.1f' % (index / 7.0),
+             u'--' if index % 5 == 0 else u'%d' % (index % 30),
+             u'',
+             u'%0.1f' % (index / 5.0),
+             ordinal(index % 32 + 1),
+             u'%0.1f' % (100.0 - index / 10.0),
+             u'%0.1f' % (100.0 - index / 9.0),
+             u'%+0.1f' % ((index % 7) - 3)]
+    return u'<tr class="pncPlayerRow playerTableBgRow%d" id="plyr%d">%s</tr>' % (
+        index % 2, index, u''.join(u'<td class="playertableData">%s</td>' % col
+                                   for col in cols))
+
+
+def players_page(offset=0, num_players=600, per_page=50):
+    rows = u'\n'.join(player_row(index)
+                      for index in range(offset, min(offset + per_page,
+                                                     num_players)))
+    return (PAGE_TEMPLATE % {
+        'scripts': _scripts(),
+        'nav': _nav(),
+        'rows': rows,
+    }).encode('utf-8')
+
+
+SLOTS = [u'QB', u'RB', u'RB', u'WR', u'WR', u'TE', u'FLEX', u'D/ST', u'K',
+         u'Bench', u'Bench', u'Bench', u'Bench', u'Bench', u'Bench', u'IR']
+
+
+def team_row(index):
+    """Clubhouse row: the roster slot first, then the player - 17 `<td>`s
+    """
+    cols = [SLOTS[index % len(SLOTS)],
+            u'<a href="#" playerid="%d">%s</a>' % (index, player_info(index)),
+            u'',
+            u'',
+            u'<a href="#">@%s</a>' % TEAMS[(index + 1) % len(TEAMS)],
+            u'<a href="#">Sun 1:00</a>',
+            u'',
+            u'%d' % index,
+            u'%d.0' % (index * 3),
+            u'%0.1f' % (index / 7.0),
+            u'%d' % (index % 30),
+            u'',
+            u'%0.1f' % (index / 5.0),
+            ordinal(index % 32 + 1),
+            u'%0.1f' % (100.0 - index / 10.0),
+            u'%0.1f' % (100.0 - index / 9.0),
+            u'%+0.1f' % ((index % 7) - 3)]
+    return u'<tr class="pncPlayerRow playerTableBgRow%d" id="plyr%d">%s</tr>' % (
+        index % 2, index, u''.join(u'<td class="playertableData">%s</td>' % col
+                                   for col in cols))
+
+
+def team_page(num_players=len(SLOTS)):
+    rows = u'\n'.join(team_row(index) for index in range(num_players))
+    return (PAGE_TEMPLATE % {
+        'scripts': _scripts(),
+        'nav': _nav(),
+        'rows': rows,
+    }).encode('utf-8')
+
+
+SCOREBOARD_LABELS = [(u'Top Scorer', u'TOP:'), (u'', u'Bench Total:'),
+                     (u'Yet to Play', u'YTP:'), (u'In Play', u'IP:')]
+
+SCOREBOARD_TEMPLATE = u"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Scoreboard - ESPN Fantasy Football</title>
+%(scripts)s
+</head>
+<body>
+<div id="global-nav">%(nav)s</div>
+<div id="scoreboardMatchups">
+%(matchups)s
+</div>
+<div id="footer">%(nav)s</div>
+</body>
+</html>
+"""
+
+
+def _scoreboard_team(index):
+    return (u'<tr><td class="team"><div class="name">'
+            u'<a href="/ffl/clubhouse?teamId=%(index)d">Team %(index)d</a> '
+            u'<span class="abbrev">(T%(index)d)</span> '
+            u'<span class="record">(%(wins)d-%(losses)d)</span></div>'
+            u'<div class="owners">Owner %(index)d</div></td>'
+            u'<td class="score" title="%(score)0.1f">%(score)0.1f</td>'
+            u'</tr>' % {
+                'index': index,
+                'wins': index % 5,
+                'losses': 4 - index % 5,
+                'score': 60 + index * 7.3,
+            })
+
+
+def _players_played(index):
+    values = [u'Player%d Lastname%d' % (index, index),
+              u'%0.1f' % (index * 1.5), u'%d' % (index % 4), u'%d' % (index % 3)]
+    return u'<div class="playersPlayed">%s</div>' % u''.join(
+        u'<div>%s</div>' % value for value in values)
+
+
+def matchup(index):
+    home, away = index * 2 + 1, index * 2 + 2
+    labels = u''.join(u'<div title="%s">%s</div>' % label if label[0] else
+                      u'<div>%s</div>' % label[1]
+                      for label in SCOREBOARD_LABELS)
+    return (u'<table class="ptsBased matchup">%s%s'
+            u'<tr><td colspan="2"><div class="scoringDetails">'
+            u'<div class="labels">%s</div>%s%s</div></td></tr>'
+            u'</table>' % (_scoreboard_team(home),
+                           _scoreboard_team(away),
+                           labels,
+                           _players_played(home),
+                           _players_played(away)))
+
+
+def scoreboard_page(num_teams=12):
+    matchups = u'\n'.join(matchup(index) for index in range(num_teams // 2))
+    return (SCOREBOARD_TEMPLATE % {
+        'scripts': _scripts(),
+        'nav': _nav(),
+        'matchups': matchups,
+    }).encode('utf-8')
+
+
+LEAGUE_ID = '1'
+TEAM_ID = '1'
+SEASON_ID = '2016'
+
+
+def get_fixtures(num_players=600, num_teams=12, per_page=50):
+    """A fixture set (see `fantasyfootball.fixtures`) for league `LEAGUE_ID`:
+    clubhouse, free-agency pages (ending with an empty one, like ESPN) and
+    scoreboard
+    """
+    team = ESPNTeam(LEAGUE_ID, TEAM_ID, SEASON_ID)
+    fixtures = {
+        get_fixture_key(team._get_team_url()): team_page(),
+        get_fixture_key(team._get_scoreboard_url()): scoreboard_page(num_teams),
+    }
+    for offset in range(0, num_players + per_page, per_page):
+        fixtures[get_fixture_key(team._get_players_url(offset))] = \
+            players_page(offset, num_players, per_page)
+    return fixtures
@@ -0,0 +1,80 @@
+"""How much cheaper downstream aggregation gets with `ESPNTeam(typed=True)`
+
+Builds a number of snapshots' worth of players in both modes, then runs the
+same aggregation (per-player mean of a few stat columns across snapshots)
+over each.
+
+Usage:
+
+    python -m benchmarks.typed [--snapshots N]
+"""
+
+import argparse
+import time
+
+from fantasyfootball.espn import ESPNTeam
+
+from benchmarks import synthetic
+
+
+COLUMNS = ('pts', 'avg', 'proj', 'pct_own', 'plus_minus')
+
+
+def to_number(value):
+    # What consumers of the string mode have to do, over and over
+    if value is None or value in ('', '--'):
+        return None
+    return float(value)
+
+
+def get_snapshots(typed, num_snapshots, num_players):
+    team = ESPNTeam(None, None, None, parser='lxml-stream', typed=typed)
+    pages = [synthetic.players_page(offset, num_players)
+             for offset in range(0, num_players, 50)]
+    start = time.time()
+    players = []
+    for content in pages:
+        players.extend(team._players_from_rows(team.parser.player_rows(content)))
+    parse_seconds = time.time() - start
+    return [players] * num_snapshots, parse_seconds
+
+
+def aggregate(snapshots, convert):
+    totals = {}
+    for players in snapshots:
+        for player in players:
+            key = (player.name, player.team)
+            sums = totals.get(key)
+            if sums is None:
+                sums = totals[key] = [0.0, 0] * len(COLUMNS)
+            for i, column in enumerate(COLUMNS):
+                value = convert(player[column])
+                if value is not None:
+                    sums[i * 2] += value
+                    sums[i * 2 + 1] += 1
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--snapshots', type=int, default=500)
+    parser.add_argument('--players', type=int, default=600)
+    args = parser.parse_args()
+    results = {}
+    for typed in (False, True):
+        snapshots, parse_seconds = get_snapshots(typed, args.snapshots,
+                                                 args.players)
+        convert = typed and (lambda value: value) or to_number
+        start = time.time()
+        results[typed] = aggregate(snapshots, convert)
+        aggregate_seconds = time.time() - start
+        print("typed=%-5s parse %7.2f ms / snapshot, aggregate %7.2f ms / snapshot"
+              % (typed,
+                 parse_seconds * 1000,
+                 aggregate_seconds * 1000 / args.snapshots))
+    if results[False] != results[True]:
+        raise AssertionError("Typed and string modes disagree")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,31 @@
 """Take a folder of date-ordered CSVs and aggregate them into one big CSV
 ordered by player and then CSV
+
+Delta snapshots (see `fantasyfootball.delta`) in the folder are read too,
+each chain walked once from its keyframe.
 """
 
+import argparse
+import collections
 import csv
 import glob
+import heapq
 import json
 import logging
+import multiprocessing
 import os.path
+import struct
 import sys
+import tempfile
 
-import csv_position_reader
 from tqdm import tqdm
 
+import player_index
+
+# `fantasyfootball` lives in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fantasyfootball import delta
+
 
 logger = logging.getLogger('')
 logger.setLevel(logging.INFO)
@@ -24,12 +38,27 @@ stream_handler.setFormatter(formatter)
 logger.addHandler(stream_handler)
 
 
+# Rows held in memory by `aggregate()` before spilling to a sorted temp file
+DEFAULT_MAX_ROWS_IN_MEMORY = 500000
+
+# `map_files()` keeps at most this many tasks per worker in flight, so
+# finished results can't pile up faster than they're consumed
+TASKS_IN_FLIGHT_PER_WORKER = 4
+
+# State every `map_files()` task needs, set once per process (see
+# `set_shared()`) instead of being pickled along with each task
+_shared = {}
+
+
 class MissingAllPlayersError(Exception):
     pass
 
 
 def get_csv_files(dir_name):
-    files = sorted(glob.glob(os.path.join(dir_name, '*.csv')))
+    """Every snapshot in `dir_name` - CSVs and deltas - in date order
+    """
+    files = sorted(glob.glob(os.path.join(dir_name, '*.csv')) +
+                   glob.glob(os.path.join(dir_name, '*' + delta.EXT_DELTA)))
     num_files = len(files)
     files = filter(lambda file: os.path.getsize(file), files)
     if len(files) < num_files:
@@ -39,49 +68,221 @@ def get_csv_files(dir_name):
     return files
 
 
-def get_filename_player_position_cache(csv_file):
-    return '%s-player-position-cache.json' % csv_file
-
-
-def get_player_str_cache(player):
-    return '|'.join(player)
+def set_shared(shared):
+    _shared.clear()
+    _shared.update(shared)
+
+
+def map_files(func, tasks, workers=None, shared=None):
+    """Yields `func(task)` for each per-file task, in order
+
+    With `workers` > 1 the tasks are fanned out over a process pool - results
+    still come back in task order, so output doesn't depend on `workers`.
+    Only `workers * TASKS_IN_FLIGHT_PER_WORKER` tasks are submitted ahead of
+    the consumer, which keeps memory bounded however slow it is. `shared`
+    (a dict) ends up in `_shared` in every process, sent once per worker
+    rather than with each task.
+    """
+    if not workers or workers <= 1:
+        set_shared(shared or {})
+        for task in tqdm(tasks):
+            yield func(task)
+        return
+    pool = multiprocessing.Pool(workers,
+                                initializer=set_shared,
+                                initargs=(shared or {},))
+    max_pending = workers * TASKS_IN_FLIGHT_PER_WORKER
+    pending = collections.deque()
+    progress = tqdm(total=len(tasks))
+    try:
+        for task in tasks:
+            pending.append(pool.apply_async(func, (task,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+                progress.update()
+        while pending:
+            yield pending.popleft().get()
+            progress.update()
+        pool.close()
+    finally:
+        progress.close()
+        pool.terminate()
+        pool.join()
+
+
+def get_segments(csv_files, all_csv_files=None):
+    """`csv_files` grouped into runs that can be read independently of each
+    other: a keyframe plus the deltas after it (a single file when there are
+    no deltas)
+
+    Segments are lists of `(csv_file, index in csv_files)`. When `csv_files`
+    only holds some of `all_csv_files`, deltas whose keyframe isn't in
+    `csv_files` pull in the files before them, with an index of `None`.
+    """
+    file_indexes = dict((csv_file, file_index)
+                        for file_index, csv_file in enumerate(csv_files))
+    segments = []
+    for csv_file in all_csv_files or csv_files:
+        if not segments or not delta.is_delta(csv_file):
+            segments.append([])
+        segments[-1].append((csv_file, file_indexes.get(csv_file)))
+    # No need to walk past the last file we're after
+    for segment in segments:
+        while segment and segment[-1][1] is None:
+            segment.pop()
+    return [segment for segment in segments if segment]
+
+
+def iter_snapshots(csv_files):
+    """Yields `(csv_file, header, rows)` for each file of a segment (see
+    `get_segments()`): a lone CSV is streamed, a chain is rebuilt with each
+    delta applied once
+    """
+    if len(csv_files) == 1 and not delta.is_delta(csv_files[0]):
+        with open(csv_files[0], 'r') as fp:
+            reader = csv.reader(fp)
+            yield csv_files[0], next(reader), reader
+        return
+    for csv_file, header, rows in delta.iter_chain(csv_files):
+        yield csv_file, header, rows.values()
+
+
+def map_segment_task(task):
+    """`func(csv_file, file_index, header, rows)` for each file of a
+    segment that's in `csv_files`, see `map_snapshots()`
+    """
+    func, segment = task
+    snapshots = iter_snapshots([csv_file for csv_file, _ in segment])
+    results = []
+    for csv_file, file_index in segment:
+        _, header, rows = next(snapshots)
+        if file_index is not None:
+            results.append(func(csv_file, file_index, header, rows))
+    return results
+
+
+def map_snapshots(func, csv_files, workers=None, shared=None,
+                  all_csv_files=None):
+    """Yields `func(csv_file, file_index, header, rows)` for each of
+    `csv_files`, in order - `file_index` being its index in `csv_files`
+
+    Work is split up by `get_segments()` (so `all_csv_files` has to be given
+    when `csv_files` holds deltas but not their keyframes) and fanned out
+    with `map_files()`.
+    """
+    tasks = [(func, segment)
+             for segment in get_segments(csv_files, all_csv_files)]
+    for results in map_files(map_segment_task, tasks, workers, shared):
+        for result in results:
+            yield result
+
+
+def lookup_file_players(csv_file, file_index, header, rows):
+    """Unique players of one snapshot
+    """
+    players = set()
+    index_name = header.index('name')
+    index_team = header.index('team')
+    index_pos = header.index('pos')
+    for row in rows:
+        try:
+            players.add((row[index_name].replace('*', ''),
+                         row[index_team],
+                         row[index_pos]))
+        except IndexError:
+            logger.debug("Short row in csv file `%s`: %s", csv_file, row)
+    return players
 
 
-def lookup_unique_players(csv_files, write_cache=True):
+def lookup_unique_players(csv_files, workers=None, all_csv_files=None):
     logger.info("Getting unique players ...")
     players = set()
-    for csv_file in tqdm(csv_files):
-        with open(csv_file, 'r') as fp:
-            reader = csv_position_reader.DictReader(fp)
-            player_position_cache = {}
-            for position, row in reader:
-                name = row['name'].replace('*', '')
-                player = (name, row['team'], row['pos'])
-                players.add(player)
-                player_str_cache = get_player_str_cache(player)
-                player_position_cache[player_str_cache] = position
-        if write_cache:
-            filename = get_filename_player_position_cache(csv_file)
-            with open(filename, 'w') as fp:
-                json.dump(player_position_cache, fp)
+    for file_players in map_snapshots(lookup_file_players, csv_files, workers,
+                                      all_csv_files=all_csv_files):
+        players.update(file_players)
     logging.info("Found `%s` players", len(players))
     return sorted(players)
 
 
-def get_unique_players(dir_name_basename, csv_files):
-    filename_players_cache = '%s.players-cache.json' % dir_name_basename
+def get_filename_manifest(filename):
+    return '%s.manifest.json' % filename
+
+
+def get_file_stamp(csv_file):
+    stat = os.stat(csv_file)
+    return [stat.st_size, stat.st_mtime]
+
+
+def load_manifest(filename):
+    """The manifest of CSV files already folded into output `filename`, if
+    any (and `filename` is still there)
+    """
+    if not os.path.exists(filename):
+        if os.path.exists(get_filename_manifest(filename)):
+            logger.warning("`%s` went away, ignoring its manifest", filename)
+        return None
+    try:
+        with open(get_filename_manifest(filename), 'r') as fp:
+            return json.load(fp)
+    except (IOError, ValueError):
+        return None
+
+
+def save_manifest(filename, csv_files, **extra):
+    manifest = dict(extra)
+    manifest['files'] = dict((csv_file, get_file_stamp(csv_file))
+                             for csv_file in csv_files)
+    with open(get_filename_manifest(filename), 'w') as fp:
+        json.dump(manifest, fp)
+
+
+def get_new_csv_files(manifest, csv_files):
+    """CSV files not yet in `manifest`, or `None` when the output has to be
+    rebuilt from scratch (no manifest, or folded-in files changed/went away)
+    """
+    if not manifest:
+        return None
+    folded = manifest['files']
+    current = set(csv_files)
+    for csv_file, stamp in folded.items():
+        if csv_file not in current:
+            logger.warning("CSV file `%s` went away", csv_file)
+            return None
+        if get_file_stamp(csv_file) != stamp:
+            logger.warning("CSV file `%s` changed", csv_file)
+            return None
+    return [csv_file for csv_file in csv_files if csv_file not in folded]
+
+
+def get_unique_players(dir_name_basename, csv_files, workers=None):
+    """Every player across `csv_files`, sorted
+
+    Cached in `<dir>.players-cache.bin`, along with a manifest of the CSV
+    files it covers, so new snapshots only extend the set.
+    """
+    filename_players_cache = '%s.players-cache.bin' % dir_name_basename
     try:
-        with open(filename_players_cache, 'r') as fp:
-            players = json.load(fp)
+        players = player_index.read_players(filename_players_cache)
+    except:
+        players = None
+    new_csv_files = get_new_csv_files(load_manifest(filename_players_cache),
+                                      csv_files)
+    if players is None or new_csv_files is None:
+        logger.warning("Unable to use players cache `%s`, building it now ...",
+                       filename_players_cache)
+        players = lookup_unique_players(csv_files, workers=workers)
+    elif new_csv_files:
+        logger.info("Extending players cache `%s` with `%s` new CSV files ...",
+                    filename_players_cache,
+                    len(new_csv_files))
+        players = sorted(set(players).union(
+            lookup_unique_players(new_csv_files, workers=workers,
+                                  all_csv_files=csv_files)))
+    else:
         logger.info("Using players cache `%s`", filename_players_cache)
         return players
-    except:
-        pass
-    logger.warning("Unable to load players cache `%s`, building it now ...",
-                   filename_players_cache)
-    players = lookup_unique_players(csv_files)
-    with open(filename_players_cache, 'w') as fp:
-        json.dump(players, fp)
+    player_index.write_players(filename_players_cache, players)
+    save_manifest(filename_players_cache, csv_files)
     return players
 
 
@@ -90,158 +291,376 @@ def get_player_str(player):
     return "%s, %s %s" % (name, team, pos)
 
 
-class PlayerValueLookup(object):
-    player_position_cache = None
+def get_player_indexes(players):
+    return dict((player, index) for index, player in enumerate(players))
 
-    def __init__(self, csv_file):
-        self.fp = open(csv_file, 'r')
-        self.reader = csv_position_reader.DictReader(self.fp)
-        self.reader.set_header()
-        self.load_player_position_cache(csv_file)
 
-    def load_player_position_cache(self, csv_file):
+def read_column_values(csv_file, header, rows, column, player_indexes):
+    """One sequential pass over a snapshot's `rows`, filling a preallocated
+    row of `column` values in `player_indexes` order ('' where missing)
+    """
+    values = [''] * len(player_indexes)
+    index_name = header.index('name')
+    index_team = header.index('team')
+    index_pos = header.index('pos')
+    index_column = header.index(column)
+    for row in rows:
         try:
-            filename = get_filename_player_position_cache(csv_file)
-            with open(filename, 'r') as fp:
-                self.player_position_cache = json.load(fp)
-        except KeyboardInterrupt:
-            raise
-        except:
-            logger.warning("Error loading player_position_cache for csv `%s`",
-                           csv_file)
-
-    def close(self):
-        self.fp.close()
-
-    def get_player_row_brute_force(self, player):
-        self.fp.seek(0)
-        reader = csv.DictReader(self.fp)
-        name, team, pos = player
-        for row in reader:
-            if row['name'].replace('*', '') != name:
-                continue
-            if row['team'] != team:
-                continue
-            if row['pos'] != pos:
-                continue
-            return row
-        return None
-
-    def get_player_row(self, player):
-        if self.player_position_cache:
-            player_str_cache = get_player_str_cache(player)
-            if player_str_cache in self.player_position_cache:
-                position = self.player_position_cache[player_str_cache]
-                self.reader.seek(position)
-                position, row = self.reader.next()
-                return row
-            logger.debug("Player not in player_position_cache: %s",
-                         player)
-            # TODO: If the cache exists and the player isn't in it do we
-            # fallback to brute force or just return ''?
-            return None
-        return self.get_player_row_brute_force(player)
-
-    def get_player_row_value(self, player, column):
-        row = self.get_player_row(player)
-        return row and row[column] or ''
-
-
-def get_csv_row_for_column(players, csv_file, column):
+            player = (row[index_name].replace('*', ''),
+                      row[index_team],
+                      row[index_pos])
+            value = row[index_column]
+        except IndexError:
+            logger.debug("Short row in csv file `%s`: %s", csv_file, row)
+            continue
+        index = player_indexes.get(player)
+        if index is not None:
+            values[index] = value
+    return values
+
+
+def get_csv_row_for_column(player_indexes, csv_file, header, rows, column):
     row = [os.path.basename(csv_file)]
-    num_players_missing = 0
-    lookup = PlayerValueLookup(csv_file)
-    for player in players:
-        value = lookup.get_player_row_value(player, column)
-        if not value:
-            logger.debug("Missing player `%s` for csv file `%s`",
-                         player,
-                         csv_file)
-            num_players_missing += 1
-        row.append(value)
-    lookup.close()
+    values = read_column_values(csv_file, header, rows, column,
+                                player_indexes)
+    num_players_missing = values.count('')
+    row += values
     if num_players_missing:
         logger.info("Missing `%s` of `%s` players for csv file `%s`",
                     num_players_missing,
-                    len(players),
+                    len(player_indexes),
                     csv_file)
-        if num_players_missing == len(players):
+        if num_players_missing == len(player_indexes):
             # Optimization, don't write this row
             raise MissingAllPlayersError("Missing all players for csv_file!")
     return row
 
 
-def aggregate_for_column(dir_name, column):
+def get_csv_row_for_column_task(csv_file, file_index, header, rows):
+    """`get_csv_row_for_column()` for `map_snapshots()` (with
+    `player_indexes` and `column` shared) - `None` when there's no row to
+    write
+    """
+    try:
+        return get_csv_row_for_column(_shared['player_indexes'], csv_file,
+                                      header, rows, _shared['column'])
+    except KeyboardInterrupt:
+        raise
+    except MissingAllPlayersError:
+        return None
+    except:
+        logger.exception("Error getting CSV row for filename `%s`",
+                         csv_file)
+        return None
+
+
+def get_filename_column_players(filename):
+    # Column order of a wide CSV, see `aggregate_for_column()`
+    return '%s.players.bin' % filename
+
+
+def write_rows_for_column(writer, player_indexes, csv_files, column, workers,
+                          all_csv_files=None):
+    logger.info("Writing CSV files ...")
+    shared = {'player_indexes': player_indexes, 'column': column}
+    for row in map_snapshots(get_csv_row_for_column_task, csv_files, workers,
+                             shared, all_csv_files):
+        if row:
+            writer.writerow(row)
+
+
+def add_player_columns(filename, players, new_players):
+    """Rewrites wide CSV `filename` with (empty) columns for `new_players`
+    tacked onto the end
+    """
+    logger.info("Adding `%s` player columns to `%s` ...",
+                len(new_players),
+                filename)
+    padding = [''] * len(new_players)
+    filename_tmp = '%s.tmp' % filename
+    with open(filename, 'r') as fp_in, open(filename_tmp, 'w') as fp_out:
+        reader = csv.reader(fp_in)
+        writer = csv.writer(fp_out)
+        next(reader)
+        writer.writerow(['filename'] +
+                        map(get_player_str, players + new_players))
+        for row in reader:
+            writer.writerow(row + padding)
+    os.rename(filename_tmp, filename)
+
+
+def append_for_column(filename, dir_name_basename, csv_files, new_csv_files,
+                      column, workers=None):
+    """Folds `new_csv_files` into an existing wide CSV
+
+    Rows for the new files get appended. Players never seen before get new
+    columns at the end (so unlike a full rebuild, columns are then only
+    sorted within each batch).
+
+    Returns `False` (without touching `filename`) when its players list is
+    missing or unreadable, in which case it has to be rebuilt.
+    """
+    filename_players = get_filename_column_players(filename)
+    try:
+        players = player_index.read_players(filename_players)
+    except (IOError, OSError, struct.error,
+            player_index.InvalidIndexError) as e:
+        logger.warning("Unable to read players list `%s`: %s",
+                       filename_players,
+                       e)
+        return False
+    all_players = get_unique_players(dir_name_basename, csv_files, workers)
+    known_players = set(players)
+    new_players = [player for player in all_players
+                   if player not in known_players]
+    if new_players:
+        add_player_columns(filename, players, new_players)
+        players += new_players
+        player_index.write_players(filename_players, players)
+    player_indexes = get_player_indexes(players)
+    logger.info("Appending `%s` CSV files to `%s`",
+                len(new_csv_files),
+                filename)
+    with open(filename, 'a') as fp:
+        writer = csv.writer(fp)
+        write_rows_for_column(writer, player_indexes, new_csv_files, column,
+                              workers, all_csv_files=csv_files)
+    save_manifest(filename, csv_files)
+    return True
+
+
+def aggregate_for_column(dir_name, column, workers=None, incremental=False):
     logger.info("Aggregating data from dir `%s` / column `%s` ...",
                 dir_name,
                 column)
     csv_files = get_csv_files(dir_name)
     logger.info("Got `%s` CSV files", len(csv_files))
     dir_name_basename = os.path.basename(dir_name)
-    players = get_unique_players(dir_name_basename, csv_files)
     filename = '%s-players-all-%s.csv' % (dir_name_basename, column)
+    if incremental:
+        new_csv_files = get_new_csv_files(load_manifest(filename), csv_files)
+        if new_csv_files is not None:
+            if not new_csv_files:
+                logger.info("No new CSV files, `%s` is up to date", filename)
+                return
+            if append_for_column(filename, dir_name_basename, csv_files,
+                                 new_csv_files, column, workers):
+                return
+        logger.warning("Unable to aggregate `%s` incrementally, rebuilding",
+                       filename)
+    players = get_unique_players(dir_name_basename, csv_files, workers)
+    player_indexes = get_player_indexes(players)
     logger.info("Writing to `%s`", filename)
     with open(filename, 'w') as fp:
         writer = csv.writer(fp)
         row_header = ['filename'] + map(get_player_str, players)
         writer.writerow(row_header)
-        logger.info("Writing CSV files ...")
-        for csv_file in tqdm(csv_files):
-            try:
-                row = get_csv_row_for_column(players, csv_file, column)
-            except KeyboardInterrupt:
-                raise
-            except MissingAllPlayersError:
-                continue
-            except:
-                logger.exception("Error getting CSV row for filename `%s`",
-                                 csv_file)
-                continue
-            writer.writerow(row)
+        write_rows_for_column(writer, player_indexes, csv_files, column,
+                              workers)
+    player_index.write_players(get_filename_column_players(filename), players)
+    save_manifest(filename, csv_files)
+
+
+class SortedRuns(object):
+    """Sorts more rows than fit in memory
+
+    Rows get buffered until there are `max_rows` of them, at which point the
+    buffer is sorted and spilled to a temp file "run". Iterating merges all
+    the runs (plus whatever is left in the buffer) back together in order.
+
+    Rows are `(name, team, pos, file_index, row_num, values)` tuples.
+    """
+
+    def __init__(self, max_rows=DEFAULT_MAX_ROWS_IN_MEMORY):
+        self.max_rows = max_rows
+        self.buffer = []
+        self.runs = []
+
+    def extend(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.max_rows:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort()
+        fp = tempfile.TemporaryFile(mode='w+')
+        writer = csv.writer(fp)
+        for name, team, pos, file_index, row_num, values in self.buffer:
+            writer.writerow([name, team, pos, file_index, row_num] + values)
+        fp.seek(0)
+        self.runs.append(fp)
+        logger.info("Spilled `%s` rows to sorted run #%s",
+                    len(self.buffer),
+                    len(self.runs))
+        self.buffer = []
+
+    @staticmethod
+    def _read_run(fp):
+        for row in csv.reader(fp):
+            yield (row[0], row[1], row[2], int(row[3]), int(row[4]), row[5:])
+
+    def __iter__(self):
+        self.buffer.sort()
+        runs = [self._read_run(fp) for fp in self.runs]
+        return heapq.merge(iter(self.buffer), *runs)
+
+    def close(self):
+        for fp in self.runs:
+            fp.close()
+        self.runs = []
+        self.buffer = []
+
+
+def get_csv_header(csv_files):
+    for csv_file in csv_files:
+        # Deltas have the same columns as their keyframe
+        if delta.is_delta(csv_file):
+            continue
+        with open(csv_file, 'r') as fp:
+            return next(csv.reader(fp))
+    return None
+
+
+def read_long_rows(csv_file, file_index, header, rows, header_attrs):
+    """All of a snapshot's `rows`, in one sequential pass, as `SortedRuns`
+    rows with values in `header_attrs` order ('--' blanked out)
+    """
+    long_rows = []
+    index_name = header.index('name')
+    index_team = header.index('team')
+    index_pos = header.index('pos')
+    indexes = [header.index(attr) if attr in header else None
+               for attr in header_attrs]
+    for row_num, row in enumerate(rows):
+        try:
+            player = (row[index_name].replace('*', ''),
+                      row[index_team],
+                      row[index_pos])
+        except IndexError:
+            logger.debug("Short row in csv file `%s`: %s", csv_file, row)
+            continue
+        values = []
+        for index in indexes:
+            value = index is not None and index < len(row) and row[index] or ''
+            if value == '--':
+                value = ''
+            values.append(value)
+        long_rows.append(player + (file_index, row_num, values))
+    return long_rows
+
+
+def read_long_rows_task(csv_file, file_index, header, rows):
+    """`read_long_rows()` for `map_snapshots()` (with `header_attrs` shared)
+    - `None` on error
+    """
+    try:
+        return read_long_rows(csv_file, file_index, header, rows,
+                              _shared['header_attrs'])
+    except KeyboardInterrupt:
+        raise
+    except:
+        logger.exception("Error getting CSV rows for filename `%s`",
+                         csv_file)
+        return None
 
 
-def aggregate(dir_name):
+def read_long_runs(csv_files, row_header_attrs, max_rows_in_memory,
+                   workers=None, all_csv_files=None):
+    runs = SortedRuns(max_rows_in_memory)
+    logger.info("Reading CSV files ...")
+    for rows in map_snapshots(read_long_rows_task, csv_files, workers,
+                              {'header_attrs': row_header_attrs},
+                              all_csv_files):
+        if rows:
+            runs.extend(rows)
+    return runs
+
+
+def write_long_rows(writer, runs, csv_files):
+    previous = None
+    for name, team, pos, file_index, row_num, values in runs:
+        player = (name, team, pos)
+        if (player, file_index) == previous:
+            # Same player listed twice in one file, keep the first
+            continue
+        previous = (player, file_index)
+        row = [get_player_str(player), csv_files[file_index]]
+        writer.writerow(row + values)
+    runs.close()
+
+
+def aggregate(dir_name, max_rows_in_memory=DEFAULT_MAX_ROWS_IN_MEMORY,
+              workers=None, incremental=False):
+    """Long format: one row per player per CSV file, ordered by player and
+    then CSV file
+
+    Every CSV file is read exactly once; rows are then grouped by player
+    with an external sort, so memory stays bounded by `max_rows_in_memory`.
+
+    With `incremental`, only CSV files not yet folded in get read, and their
+    rows are appended (ordered by player within that batch).
+    """
     logger.info("Aggregating data from dir `%s` ...", dir_name)
     csv_files = get_csv_files(dir_name)
     logger.info("Got `%s` CSV files", len(csv_files))
     dir_name_basename = os.path.basename(dir_name)
-    players = get_unique_players(dir_name_basename, csv_files)
     filename = '%s-players-all.csv' % dir_name_basename
+    if incremental:
+        manifest = load_manifest(filename)
+        new_csv_files = get_new_csv_files(manifest, csv_files)
+        if new_csv_files is not None:
+            if not new_csv_files:
+                logger.info("No new CSV files, `%s` is up to date", filename)
+                return
+            row_header_attrs = manifest['header']
+            runs = read_long_runs(new_csv_files, row_header_attrs,
+                                  max_rows_in_memory, workers,
+                                  all_csv_files=csv_files)
+            logger.info("Appending `%s` CSV files to `%s` (ordered by player "
+                        "within this batch only)",
+                        len(new_csv_files),
+                        filename)
+            with open(filename, 'a') as fp:
+                write_long_rows(csv.writer(fp), runs, new_csv_files)
+            save_manifest(filename, csv_files, header=row_header_attrs)
+            return
+        logger.warning("Unable to aggregate `%s` incrementally, rebuilding",
+                       filename)
+    row_header_attrs = get_csv_header(csv_files)
+    if not row_header_attrs:
+        logger.warning("No CSV files with data, nothing to do")
+        return
+    runs = read_long_runs(csv_files, row_header_attrs, max_rows_in_memory,
+                          workers)
     logger.info("Writing to `%s`", filename)
     with open(filename, 'w') as fp:
         writer = csv.writer(fp)
-        row_header = ['player', 'filename']
-        row_header_attrs = None
-        for player in tqdm(players):
-            player_str = get_player_str(player)
-            for csv_file in csv_files:
-                try:
-                    lookup = PlayerValueLookup(csv_file)
-                    csv_row = lookup.get_player_row(player)
-                    lookup.close()
-                except KeyboardInterrupt:
-                    raise
-                except:
-                    logger.exception("Error getting CSV row for filename `%s`",
-                                     csv_file)
-                    continue
-                if not csv_row:
-                    continue
-                if not row_header_attrs:
-                    row_header_attrs = csv_row.keys()
-                    writer.writerow(row_header + row_header_attrs)
-                row = [player_str, csv_file]
-                for key in row_header_attrs:
-                    value = csv_row.get(key) or ''
-                    if value == '--':
-                        value = ''
-                    row.append(value)
-                writer.writerow(row)
+        writer.writerow(['player', 'filename'] + row_header_attrs)
+        write_long_rows(writer, runs, csv_files)
+    save_manifest(filename, csv_files, header=row_header_attrs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('dir_name', help="Folder of snapshot CSVs (and deltas)")
+    parser.add_argument('column', nargs='?',
+                        help="Only aggregate this column (wide format)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Process files on a pool of this many processes")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only fold in CSV files added since the last "
+                             "run. New rows (long format) or new player "
+                             "columns (wide format) get appended, so output "
+                             "is only ordered by player within each run; "
+                             "leave it off to get a fully ordered rebuild")
+    args = parser.parse_args()
+    if args.column:
+        aggregate_for_column(args.dir_name, args.column, args.workers,
+                             args.incremental)
+    else:
+        aggregate(args.dir_name, workers=args.workers,
+                  incremental=args.incremental)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        logger.error("Missing dir name")
-        sys.exit(1)
-    dir_name = sys.argv[1]
-    aggregate(dir_name)
+    main()
@@ -0,0 +1,65 @@
+"""Compact binary players lists for the CSV aggregator
+
+Players list (`<dir>.players-cache.bin`, one per snapshot folder, and
+`<output>.players.bin`, the column order of a wide CSV):
+
+    header:  magic `FFPL`, uint32 count
+    records: count x (uint16 length, `name|team|pos` UTF-8 bytes)
+"""
+
+import struct
+
+
+PLAYERS_MAGIC = b'FFPL'
+HEADER = struct.Struct('<4sI')
+PLAYER_LENGTH = struct.Struct('<H')
+
+PLAYER_KEY_SEPARATOR = '|'
+
+
+class InvalidIndexError(Exception):
+    pass
+
+
+def _to_bytes(value):
+    # Python 2 CSV values are already (UTF-8) byte strings
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def get_player_key(player):
+    return PLAYER_KEY_SEPARATOR.join(player)
+
+
+def write_players(filename, players):
+    with open(filename, 'wb') as fp:
+        fp.write(HEADER.pack(PLAYERS_MAGIC, len(players)))
+        for player in players:
+            data = _to_bytes(get_player_key(player))
+            fp.write(PLAYER_LENGTH.pack(len(data)))
+            fp.write(data)
+
+
+def read_players(filename):
+    with open(filename, 'rb') as fp:
+        data = fp.read()
+    if len(data) < HEADER.size:
+        raise InvalidIndexError("Truncated players list `%s`" % filename)
+    magic, count = HEADER.unpack_from(data, 0)
+    if magic != PLAYERS_MAGIC:
+        raise InvalidIndexError("Invalid players list `%s`" % filename)
+    players = []
+    position = HEADER.size
+    for _ in range(count):
+        length, = PLAYER_LENGTH.unpack_from(data, position)
+        position += PLAYER_LENGTH.size
+        player_key = data[position:position + length]
+        position += length
+        if str is bytes:
+            # Python 2: keep byte strings, like the CSV reader does
+            players.append(tuple(player_key.split(PLAYER_KEY_SEPARATOR)))
+        else:
+            players.append(tuple(player_key.decode('utf-8')
+                                 .split(PLAYER_KEY_SEPARATOR)))
+    return players
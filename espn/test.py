@@ -0,0 +1,213 @@
+"""Tests for `csv-aggregator.py`'s incremental mode (Python 2, like the
+aggregator)
+
+Run from this folder:
+
+    python -m unittest test
+"""
+
+import csv
+import imp
+import os
+import shutil
+import tempfile
+import unittest
+
+
+DIR_NAME = os.path.dirname(os.path.abspath(__file__))
+
+csv_aggregator = imp.load_source('csv_aggregator',
+                                 os.path.join(DIR_NAME, 'csv-aggregator.py'))
+# Imported by the aggregator, which puts the repo root on `sys.path`
+delta = csv_aggregator.delta
+
+
+HEADER_ROW = ['name', 'team', 'pos', 'pts']
+
+
+class TestIncrementalAggregation(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+        os.mkdir('snaps')
+        self.write_snapshot('players-2016-09-01.csv',
+                            [['Tom Brady*', 'NE', 'QB', '20'],
+                             ['Mike Williams', 'SD', 'WR', '7']])
+        self.write_snapshot('players-2016-09-02.csv',
+                            [['Tom Brady', 'NE', 'QB', '22'],
+                             ['Mike Williams', 'TB', 'WR', '3']])
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def write_snapshot(self, basename, rows):
+        with open(os.path.join('snaps', basename), 'w') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(HEADER_ROW)
+            writer.writerows(rows)
+
+    def add_third_snapshot(self):
+        self.write_snapshot('players-2016-09-03.csv',
+                            [['Tom Brady', 'NE', 'QB', '25'],
+                             ['Odell Beckham Jr.', 'NYG', 'WR', '11']])
+
+    def read_wide(self, filename):
+        """`{(csv file, player): value}`, whatever the column order
+        """
+        with open(filename, 'r') as fp:
+            reader = csv.reader(fp)
+            players = next(reader)[1:]
+            return dict(((row[0], player), value)
+                        for row in reader
+                        for player, value in zip(players, row[1:]))
+
+    def read_long(self, filename):
+        with open(filename, 'r') as fp:
+            return sorted(csv.reader(fp))
+
+    def rebuild_wide(self):
+        os.mkdir('full')
+        os.chdir('full')
+        csv_aggregator.aggregate_for_column(os.path.join('..', 'snaps'), 'pts')
+        os.chdir('..')
+        return self.read_wide(os.path.join('full', 'snaps-players-all-pts.csv'))
+
+    def test_wide_append(self):
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        self.add_third_snapshot()
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        filename = 'snaps-players-all-pts.csv'
+        with open(filename, 'r') as fp:
+            header_row = next(csv.reader(fp))
+        # New players are tacked onto the end
+        self.assertEqual(header_row[-1], 'Odell Beckham Jr., NYG WR')
+        self.assertEqual(self.read_wide(filename), self.rebuild_wide())
+        manifest = csv_aggregator.load_manifest(filename)
+        self.assertEqual(len(manifest['files']), 3)
+
+    def test_wide_up_to_date(self):
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        filename = 'snaps-players-all-pts.csv'
+        os.utime(filename, (0, 0))
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        self.assertEqual(os.path.getmtime(filename), 0)
+
+    def test_wide_changed_file_rebuilds(self):
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        self.write_snapshot('players-2016-09-01.csv',
+                            [['Tom Brady', 'NE', 'QB', '200']])
+        self.assertIsNone(csv_aggregator.get_new_csv_files(
+            csv_aggregator.load_manifest('snaps-players-all-pts.csv'),
+            csv_aggregator.get_csv_files('snaps')))
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        self.assertEqual(self.read_wide('snaps-players-all-pts.csv'),
+                         self.rebuild_wide())
+
+    def test_wide_missing_players_list_rebuilds(self):
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        os.remove('snaps-players-all-pts.csv.players.bin')
+        self.add_third_snapshot()
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        self.assertEqual(self.read_wide('snaps-players-all-pts.csv'),
+                         self.rebuild_wide())
+
+    def test_wide_corrupt_players_list_rebuilds(self):
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        with open('snaps-players-all-pts.csv.players.bin', 'wb') as fp:
+            fp.write(b'garbage')
+        self.add_third_snapshot()
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        self.assertEqual(self.read_wide('snaps-players-all-pts.csv'),
+                         self.rebuild_wide())
+
+    def test_missing_output_rebuilds(self):
+        csv_aggregator.aggregate('snaps', incremental=True)
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        os.remove('snaps-players-all.csv')
+        os.remove('snaps-players-all-pts.csv')
+        self.add_third_snapshot()
+        csv_aggregator.aggregate('snaps', incremental=True)
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        incremental_rows = self.read_long('snaps-players-all.csv')
+        # Earlier snapshots included, header and all
+        os.remove('snaps-players-all.csv')
+        csv_aggregator.aggregate('snaps')
+        self.assertEqual(incremental_rows,
+                         self.read_long('snaps-players-all.csv'))
+        self.assertEqual(self.read_wide('snaps-players-all-pts.csv'),
+                         self.rebuild_wide())
+
+    def make_deltas(self):
+        """Swaps every snapshot but the first for a delta
+        """
+        previous_filename = None
+        for filename in sorted(os.listdir('snaps')):
+            filename = os.path.join('snaps', filename)
+            if previous_filename is not None:
+                delta_filename = filename[:-len(delta.EXT_KEYFRAME)] + \
+                    delta.EXT_DELTA
+                delta.make_delta(previous_filename, filename, delta_filename)
+                os.remove(filename)
+                filename = delta_filename
+            previous_filename = filename
+
+    def read_outputs(self):
+        # Deltas show up under their own filenames
+        long_rows = [[value.replace(delta.EXT_DELTA, delta.EXT_KEYFRAME)
+                      for value in row]
+                     for row in self.read_long('snaps-players-all.csv')]
+        wide = dict(((filename.replace(delta.EXT_DELTA, delta.EXT_KEYFRAME),
+                      player), value)
+                    for (filename, player), value in
+                    self.read_wide('snaps-players-all-pts.csv').items())
+        return long_rows, wide
+
+    def test_delta_snapshots(self):
+        self.add_third_snapshot()
+        csv_aggregator.aggregate('snaps')
+        csv_aggregator.aggregate_for_column('snaps', 'pts')
+        expected = self.read_outputs()
+        self.make_deltas()
+        self.assertEqual(len(csv_aggregator.get_csv_files('snaps')), 3)
+        csv_aggregator.aggregate('snaps', workers=2)
+        csv_aggregator.aggregate_for_column('snaps', 'pts')
+        self.assertEqual(self.read_outputs(), expected)
+
+    def test_delta_snapshots_incremental(self):
+        self.make_deltas()
+        csv_aggregator.aggregate('snaps', incremental=True)
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        # Only the new delta is read, rebuilt from the chain before it
+        self.write_snapshot('players-2016-09-03.csv',
+                            [['Tom Brady', 'NE', 'QB', '25']])
+        delta.make_delta(os.path.join('snaps', 'players-2016-09-02.delta'),
+                         os.path.join('snaps', 'players-2016-09-03.csv'),
+                         os.path.join('snaps', 'players-2016-09-03.delta'))
+        os.remove(os.path.join('snaps', 'players-2016-09-03.csv'))
+        csv_aggregator.aggregate('snaps', incremental=True)
+        csv_aggregator.aggregate_for_column('snaps', 'pts', incremental=True)
+        long_rows, wide = self.read_outputs()
+        self.assertIn(['Tom Brady, NE QB', 'snaps/players-2016-09-03.csv',
+                       'Tom Brady', 'NE', 'QB', '25'], long_rows)
+        self.assertEqual(wide[('players-2016-09-03.csv', 'Tom Brady, NE QB')],
+                         '25')
+        self.assertEqual(wide[('players-2016-09-03.csv',
+                               'Mike Williams, TB WR')], '')
+
+    def test_long_append(self):
+        csv_aggregator.aggregate('snaps', incremental=True)
+        self.add_third_snapshot()
+        csv_aggregator.aggregate('snaps', incremental=True)
+        incremental_rows = self.read_long('snaps-players-all.csv')
+        os.remove('snaps-players-all.csv')
+        csv_aggregator.aggregate('snaps')
+        # Same rows, only ordered by player within each run
+        self.assertEqual(incremental_rows,
+                         self.read_long('snaps-players-all.csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
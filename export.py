@@ -5,9 +5,16 @@ import calendar
 import csv
 import datetime
 import logging
+from multiprocessing.pool import ThreadPool
 import os
 
-from fantasyfootball.espn import ESPNTeam
+from fantasyfootball import columnar
+from fantasyfootball import delta
+from fantasyfootball.cache import ResponseCache
+from fantasyfootball.espn import ESPNTeam, make_session, PARSER
+from fantasyfootball.metrics import Metrics, write_prometheus
+from fantasyfootball.ratelimit import RateLimiter
+from fantasyfootball.store import PlayerStore, get_snapshot_time
 
 import settings
 
@@ -18,6 +25,11 @@ LOGGING_DIR = os.path.join(BASE_DIR, 'logs')
 LOG_FILENAME = os.path.join(LOGGING_DIR, 'export.log')
 
 DATA_DIR = os.path.join(BASE_DIR, 'data')
+CACHE_DIR = os.path.join(DATA_DIR, 'http-cache')
+STORE_BASENAME = 'players.sqlite'
+
+# Leagues exported at once by `export_batch()`
+BATCH_CONCURRENCY = 4
 
 
 logger = logging.getLogger('')
@@ -35,23 +47,70 @@ file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
 
-def write_data(filename, team):
-    players = team.players_generator()
-    with open(filename, 'w') as fp:
-        row_num = 0
-        writer = csv.writer(fp)
-        for row_num, player in enumerate(players, start=1):
-            if row_num == 1:
-                header_row = team.get_header_row(player)
-                writer.writerow(header_row)
-            row = []
-            for key in header_row:
-                row.append(player.get(key))
-            try:
-                writer.writerow(row)
-            except:
-                logger.exception(u"Error writing row %s: %s", row_num, row)
+def write_data(filename, team, concurrency=None, columnar_filename=None,
+               store=None):
+    """Writes every player to the CSV `filename`, and optionally to a
+    columnar snapshot (see `fantasyfootball.columnar`) and/or a `PlayerStore`
+    too
+
+    The CSV only shows up once every page was fetched: if a request fails
+    for good (see `fantasyfootball.ratelimit`), nothing is written and the
+    error is raised, rather than leaving a truncated snapshot behind.
+    """
+    metrics = team.metrics
+    players = team.players_generator(concurrency=concurrency)
+    header_row = None
+    rows = []
+    partial_filename = '%s.part' % filename
+    try:
+        with open(partial_filename, 'w') as fp:
+            row_num = 0
+            writer = csv.writer(fp)
+            for row_num, player in enumerate(players, start=1):
+                if row_num == 1:
+                    header_row = team.get_header_row(player)
+                    writer.writerow(header_row)
+                # `players_generator()` yields `Player`s, whose rows are
+                # already in `header_row` order
+                row = player.to_row()
+                if columnar_filename or store:
+                    rows.append(row)
+                try:
+                    with metrics.timer('write_csv'):
+                        writer.writerow(row)
+                except:
+                    logger.exception(u"Error writing row %s: %s", row_num, row)
+    except:
+        os.remove(partial_filename)
+        raise
+    os.rename(partial_filename, filename)
+    metrics.count('rows_written', row_num)
     logger.info("Wrote %s players to %s", row_num, filename)
+    if columnar_filename and header_row:
+        with metrics.timer('write_columnar'):
+            columnar.write_snapshot(columnar_filename, header_row, rows)
+        logger.info("Wrote %s players to %s", len(rows), columnar_filename)
+    if store and header_row:
+        with metrics.timer('write_store'):
+            store.add_snapshot(get_snapshot_time(filename), header_row, rows)
+
+
+def write_delta_if_due(filename, keyframe_every):
+    """Swaps the just-written snapshot `filename` for a delta against the
+    previous snapshot, unless it's time for a keyframe (every
+    `keyframe_every` snapshots)
+    """
+    if not os.path.getsize(filename):
+        return
+    chain = [path for path in delta.get_chain(os.path.dirname(filename))
+             if path != filename]
+    num_deltas = delta.get_num_deltas_since_keyframe(chain)
+    if num_deltas is None or num_deltas + 1 >= keyframe_every:
+        logger.info("Keeping %s as a keyframe", filename)
+        return
+    delta_filename = filename[:-len(delta.EXT_KEYFRAME)] + delta.EXT_DELTA
+    if delta.make_delta(chain[-1], filename, delta_filename):
+        os.remove(filename)
 
 
 def get_csv_datestr():
@@ -68,17 +127,58 @@ def get_csv_datestr():
     return ('-'.join([date, day_of_week, time])).replace(':', '-')
 
 
-def main():
-    # parser = argparse.ArgumentParser(description="Grab/print the team members")
-    # parser.add_argument('url', type=str, help="")
-    # args = parser.parse_args()
-    # params = ESPNTeam.parse_params_from_url(args.url)
-    # settings.ESPN_URL is something like this:
+def get_cache():
+    # Optional: reuse responses younger than this many seconds (and
+    # revalidate older ones) instead of refetching every page every run
+    cache_ttl = getattr(settings, 'ESPN_CACHE_TTL', None)
+    if cache_ttl:
+        return ResponseCache(CACHE_DIR, ttl=cache_ttl)
+    return None
+
+
+def get_rate_limiter():
+    # Optional: at most this many requests per second (backing off whenever
+    # ESPN throttles us), and optionally at most
+    # `settings.ESPN_MAX_CONCURRENT_REQUESTS` of them in flight at once
+    rate = getattr(settings, 'ESPN_RATE_LIMIT', None)
+    if rate:
+        max_concurrency = getattr(settings, 'ESPN_MAX_CONCURRENT_REQUESTS',
+                                  None)
+        return RateLimiter(rate, max_concurrency=max_concurrency)
+    return None
+
+
+def get_metrics():
+    # Optional: per-stage timings and counters, written as a JSON summary
+    # next to each export and/or in Prometheus text format to
+    # `settings.ESPN_METRICS_PROMETHEUS` (see `fantasyfootball.metrics`)
+    if getattr(settings, 'ESPN_METRICS', False) or \
+            getattr(settings, 'ESPN_METRICS_PROMETHEUS', None):
+        return Metrics()
+    return None
+
+
+def write_metrics(runs):
+    filename = getattr(settings, 'ESPN_METRICS_PROMETHEUS', None)
+    if filename:
+        write_prometheus(filename, runs)
+
+
+def make_team(url, cookie, cache=None, session=None, rate_limiter=None,
+              metrics=None):
+    # url is something like this:
     # url = "http://games.espn.com/ffl/freeagency?leagueId=<YOUR_LEAGUE_ID>&teamId=<YOUR_TEAM_ID>&seasonId=<THIS_YEAR>"
-    url = settings.ESPN_URL
     params = ESPNTeam.parse_params_from_url(url)
+    # Optional: one of `fantasyfootball.parsers.PARSERS`
+    params['parser'] = getattr(settings, 'ESPN_PARSER', PARSER)
+    # Optional: write numeric stat columns as numbers, `--` as empty
+    params['typed'] = getattr(settings, 'ESPN_TYPED', False)
+    params['cache'] = cache
+    params['session'] = session
+    params['rate_limiter'] = rate_limiter
+    params['metrics'] = metrics
     team = ESPNTeam(**params)
-    # To get `settings.ESPN_COOKIE`, in a browser (tested w/ Chrome), open the
+    # To get the cookie, in a browser (tested w/ Chrome), open the
     # JS console and click the "Network" tab. Limit the requests to only "XHR"
     # requests. Now open your ESPN Fantasy League page and click the "Players"
     # tab. A ton of resources will probably load - wait until they've all loaded
@@ -87,17 +187,134 @@ def main():
     # Right click and choose "Copy as cURL". Paste the result somewhere and nab
     # the part that says "-H 'Cookie: FFL_LM_COOKIE= ...". This is what you are
     # looking for.
-    team.set_cookie(settings.ESPN_COOKIE)
+    team.set_cookie(cookie)
+    return team
+
+
+def export_team(team, data_dir, date_str):
+    """One export of `team` into `data_dir`: the players CSV, plus whatever
+    optional outputs are turned on in `settings`
+    """
+    if not os.path.isdir(data_dir):
+        os.makedirs(data_dir)
+    filename = os.path.join(data_dir, 'players-%s.csv' % date_str)
+    # Optional: number of player pages to fetch at once
+    concurrency = getattr(settings, 'ESPN_CONCURRENCY', None)
+    # Optional: also write a columnar `.npz` snapshot next to the CSV
+    columnar_filename = None
+    if getattr(settings, 'ESPN_COLUMNAR', False):
+        columnar_filename = os.path.join(data_dir,
+                                         'players-%s.npz' % date_str)
+    # Optional: also store every snapshot in a queryable SQLite database
+    # (see `fantasyfootball.store`)
+    store = None
+    if getattr(settings, 'ESPN_STORE', False):
+        store = PlayerStore(os.path.join(data_dir, STORE_BASENAME))
+    try:
+        write_data(filename, team, concurrency, columnar_filename, store)
+    finally:
+        if store:
+            store.close()
+    # Optional: store only changed rows, with a full keyframe every N runs
+    # (see `fantasyfootball.delta`)
+    keyframe_every = getattr(settings, 'ESPN_DELTA_KEYFRAME_EVERY', None)
+    if keyframe_every:
+        with team.metrics.timer('write_delta'):
+            write_delta_if_due(filename, keyframe_every)
+    if getattr(settings, 'ESPN_METRICS', False):
+        team.metrics.write_json(os.path.join(data_dir,
+                                             'metrics-%s.json' % date_str))
+
+
+def get_league_data_dir(league, team):
+    name = league.get('name') or \
+        'league-%s-team-%s' % (team.league_id, team.team_id)
+    return os.path.join(DATA_DIR, name)
+
+
+def export_batch(leagues, date_str):
+    """Exports every league in `leagues` - dicts with a `url`, and optionally
+    a `cookie` (default: `settings.ESPN_COOKIE`) and a `name` (the folder
+    under `data/` its files go to, default: `league-<id>-team-<id>`)
+
+    Up to `settings.ESPN_BATCH_CONCURRENCY` leagues are exported at once, all
+    sharing one connection pool, response cache and rate limiter.
+    """
+    batch_concurrency = getattr(settings, 'ESPN_BATCH_CONCURRENCY',
+                                BATCH_CONCURRENCY)
+    concurrency = getattr(settings, 'ESPN_CONCURRENCY', None) or 1
+    rate_limiter = get_rate_limiter()
+    # Enough keep-alive connections for every request that can be in flight
+    session_params = {'pool_size': batch_concurrency * concurrency}
+    if rate_limiter:
+        # Retrying throttled/failed responses is up to the rate limiter
+        session_params['retry_statuses'] = ()
+    session = make_session(**session_params)
+    cache = get_cache()
+    # `(labels, metrics)` per league
+    metrics_runs = []
+
+    def export_league(league):
+        cookie = league.get('cookie') or getattr(settings, 'ESPN_COOKIE', None)
+        metrics = get_metrics()
+        try:
+            team = make_team(league['url'], cookie, cache, session,
+                             rate_limiter, metrics)
+            data_dir = get_league_data_dir(league, team)
+            if metrics:
+                metrics_runs.append(({'league': os.path.basename(data_dir)},
+                                     metrics))
+            export_team(team, data_dir, date_str)
+        except Exception:
+            # One broken league shouldn't take the rest of the batch down
+            logger.exception("Error exporting %s", league['url'])
+            return False
+        return True
+
+    pool = ThreadPool(batch_concurrency)
+    try:
+        results = pool.map(export_league, leagues)
+    finally:
+        pool.close()
+        pool.join()
+    write_metrics(metrics_runs)
+    logger.info("Exported %s of %s leagues", sum(results), len(leagues))
+    if cache:
+        logger.info("Cache stats: %s", cache.stats())
+    if rate_limiter:
+        logger.info("Rate limiter stats: %s", rate_limiter.stats())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ESPN players to CSV")
+    parser.add_argument('--batch',
+                        action='store_true',
+                        help="Export every league in `settings.ESPN_LEAGUES` "
+                             "instead of `settings.ESPN_URL`")
+    args = parser.parse_args()
+    date_str = get_csv_datestr()
+    if args.batch:
+        export_batch(settings.ESPN_LEAGUES, date_str)
+        return
+    # settings.ESPN_URL is something like this:
+    # url = "http://games.espn.com/ffl/freeagency?leagueId=<YOUR_LEAGUE_ID>&teamId=<YOUR_TEAM_ID>&seasonId=<THIS_YEAR>"
+    team = make_team(settings.ESPN_URL, settings.ESPN_COOKIE, get_cache(),
+                     rate_limiter=get_rate_limiter(),
+                     metrics=get_metrics())
 
     # print players
     # for i, player in enumerate(players, start=1):
     #     print "%d.\t%s" % (i, player)
     # write_data('data/my_team.csv', team.get_team())
 
-    date_str = get_csv_datestr()
-    basename = 'players-%s.csv' % date_str
-    filename = os.path.join(DATA_DIR, basename)
-    write_data(filename, team)
+    export_team(team, DATA_DIR, date_str)
+    if team.metrics.enabled:
+        write_metrics([({}, team.metrics)])
+    if team.cache:
+        logger.info("Cache stats: %s", team.cache.stats())
+    if team.rate_limiter:
+        logger.info("Rate limiter stats: %s", team.rate_limiter.stats())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,153 @@
+"""On-disk HTTP response cache for the ESPN scraper
+
+Entries are keyed by URL + cookie identity (the cookie itself is only ever
+stored as part of a hash). Each entry is a `<key>.body` file holding the raw
+response and a `<key>.json` file holding its metadata. Fresh entries (younger
+than `ttl`) are served straight from disk, stale ones are revalidated with
+`If-None-Match` / `If-Modified-Since`, and once the cache grows past
+`max_size` bytes the least recently used entries get evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+DEFAULT_TTL = 15 * 60
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(object):
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def get_key(url, cookie=None):
+        identity = u'%s\n%s' % (url, cookie or u'')
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    def _get_filename(self, key, ext):
+        return os.path.join(self.directory, '%s.%s' % (key, ext))
+
+    def _load(self, key):
+        try:
+            with open(self._get_filename(key, 'json'), 'r') as fp:
+                entry = json.load(fp)
+            with open(self._get_filename(key, 'body'), 'rb') as fp:
+                entry['content'] = fp.read()
+        except (IOError, OSError, ValueError):
+            return None
+        return entry
+
+    def _save_metadata(self, key, entry):
+        metadata = dict((k, v) for k, v in entry.items() if k != 'content')
+        with open(self._get_filename(key, 'json'), 'w') as fp:
+            json.dump(metadata, fp)
+
+    def _touch(self, key):
+        # Body mtime doubles as the "last used" time for LRU eviction
+        try:
+            os.utime(self._get_filename(key, 'body'), None)
+        except OSError:
+            pass
+
+    def _store(self, key, url, response):
+        entry = {
+            'url': url,
+            'stored_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': len(response.content),
+        }
+        with open(self._get_filename(key, 'body'), 'wb') as fp:
+            fp.write(response.content)
+        self._save_metadata(key, entry)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total_size = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.body'):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename[:-5]))
+            total_size += stat.st_size
+        if total_size <= self.max_size:
+            return
+        for _, size, key in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            for ext in ('body', 'json'):
+                try:
+                    os.remove(self._get_filename(key, ext))
+                except OSError:
+                    pass
+            total_size -= size
+            self.evictions += 1
+            logger.debug("Evicted cache entry %s", key)
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def fetch(self, session, url, headers=None, get=None):
+        """GET `url` through `session`, using the cache where possible
+
+        `get(url, headers)`, if given, makes the actual request instead of
+        `session.get()` (e.g. to rate limit it). Returns the response body.
+        """
+        headers = dict(headers or {})
+        key = self.get_key(url, headers.get('Cookie'))
+        with self.lock:
+            entry = self._load(key)
+            if entry and self.is_fresh(entry):
+                self.hits += 1
+                self._touch(key)
+                return entry['content']
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        if get:
+            response = get(url, headers)
+        else:
+            response = session.get(url, headers=headers)
+        with self.lock:
+            if entry and response.status_code == 304:
+                self.revalidations += 1
+                entry['stored_at'] = time.time()
+                self._save_metadata(key, entry)
+                self._touch(key)
+                return entry['content']
+            self.misses += 1
+            if response.status_code == 200:
+                self._store(key, url, response)
+        return response.content
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+        }
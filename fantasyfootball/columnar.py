@@ -0,0 +1,165 @@
+"""Columnar (NumPy `.npz`) player snapshots
+
+Each snapshot is an uncompressed `.npz` archive with one member per column,
+so reading a single stat out of hundreds of snapshots only touches that
+column's bytes. Members:
+
+- `__columns__`: column names, in CSV order
+- `__types__`: per-column type, one of `int`, `float`, `str`
+- `__keys__`: the player key dictionary, one `name|team|pos` per row
+- `<column>`: `float64` values (`NaN` when missing) for `int`/`float` columns,
+  `int32` codes into `<column>.dict` (`-1` when missing) for `str` columns
+
+Requires numpy.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from fantasyfootball.player import NUMERIC_CONVERTERS, to_int, to_ordinal
+
+
+COLUMN_TYPE_INT = 'int'
+COLUMN_TYPE_FLOAT = 'float'
+COLUMN_TYPE_STR = 'str'
+
+MISSING_CODE = -1
+
+TEXT_TYPE = type(u'')
+
+_CONVERTERS = dict(NUMERIC_CONVERTERS)
+
+
+class MissingNumpyError(Exception):
+    pass
+
+
+def _require_numpy():
+    if numpy is None:
+        raise MissingNumpyError("Columnar snapshots require numpy")
+
+
+def get_player_key(name, team, pos):
+    return u'|'.join([name.replace('*', ''), team or u'', pos or u''])
+
+
+def _get_column_type(column):
+    convert = _CONVERTERS.get(column)
+    if convert is None:
+        return COLUMN_TYPE_STR
+    if convert in (to_int, to_ordinal):
+        return COLUMN_TYPE_INT
+    return COLUMN_TYPE_FLOAT
+
+
+def _to_number(column, value):
+    # Snapshots from untyped runs still hold the raw strings
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return _CONVERTERS[column](value)
+
+
+def _encode_numeric(column, values):
+    result = numpy.empty(len(values), dtype=numpy.float64)
+    for i, value in enumerate(values):
+        value = _to_number(column, value)
+        result[i] = numpy.nan if value is None else value
+    return result
+
+
+def _encode_str(values):
+    dictionary = {}
+    codes = numpy.empty(len(values), dtype=numpy.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = MISSING_CODE
+            continue
+        codes[i] = dictionary.setdefault(value, len(dictionary))
+    strings = sorted(dictionary, key=dictionary.get)
+    return codes, numpy.array([u'%s' % value for value in strings],
+                              dtype=TEXT_TYPE)
+
+
+def write_snapshot(filename, header_row, rows):
+    """Writes `rows` (lists in `header_row` order) to `filename`
+    """
+    _require_numpy()
+    columns = list(zip(*rows)) or [()] * len(header_row)
+    indexes = dict((column, i) for i, column in enumerate(header_row))
+    arrays = {}
+    column_types = []
+    for column, values in zip(header_row, columns):
+        column_type = _get_column_type(column)
+        column_types.append(column_type)
+        if column_type == COLUMN_TYPE_STR:
+            arrays[column], arrays['%s.dict' % column] = _encode_str(values)
+        else:
+            arrays[column] = _encode_numeric(column, values)
+    keys = [get_player_key(row[indexes['name']],
+                           row[indexes['team']],
+                           row[indexes['pos']])
+            for row in rows]
+    arrays['__columns__'] = numpy.array(header_row, dtype=TEXT_TYPE)
+    arrays['__types__'] = numpy.array(column_types, dtype=TEXT_TYPE)
+    arrays['__keys__'] = numpy.array(keys, dtype=TEXT_TYPE)
+    # Uncompressed on purpose: members can then be read without inflating
+    # anything else
+    with open(filename, 'wb') as fp:
+        numpy.savez(fp, **arrays)
+
+
+class Snapshot(object):
+    """Lazy reader for one columnar snapshot - members are only read from
+    disk when asked for
+    """
+
+    def __init__(self, filename):
+        _require_numpy()
+        self.filename = filename
+        self.npz = numpy.load(filename)
+        self.columns = [u'%s' % column for column in self.npz['__columns__']]
+        self.column_types = dict(zip(self.columns,
+                                     (u'%s' % column_type
+                                      for column_type in self.npz['__types__'])))
+
+    def close(self):
+        self.npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def keys(self):
+        return [u'%s' % key for key in self.npz['__keys__']]
+
+    def get_array(self, column):
+        """Raw column: `float64` for numeric columns, `int32` codes for
+        string columns
+        """
+        return self.npz[column]
+
+    def get_column(self, column):
+        """Column as a list of Python values, `None` where missing
+        """
+        column_type = self.column_types[column]
+        values = self.npz[column]
+        if column_type == COLUMN_TYPE_STR:
+            dictionary = [u'%s' % value
+                          for value in self.npz['%s.dict' % column]]
+            return [None if code == MISSING_CODE else dictionary[code]
+                    for code in values.tolist()]
+        cast = column_type == COLUMN_TYPE_INT and int or float
+        return [None if value != value else cast(value)
+                for value in values.tolist()]
+
+
+def read_column(filename, column):
+    """`{player_key: value}` for one column of one snapshot
+    """
+    with Snapshot(filename) as snapshot:
+        return dict(zip(snapshot.keys, snapshot.get_column(column)))
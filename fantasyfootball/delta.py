@@ -0,0 +1,270 @@
+"""Delta snapshots: store only the player rows that changed between exports
+
+A snapshot chain lives in one folder and is ordered by filename:
+
+- keyframes are regular `players-<date>.csv` files
+- deltas are `players-<date>.delta` files, holding only the rows inserted,
+  updated or removed since the previous snapshot in the chain
+
+A delta is a CSV whose first columns are the operation (`I`, `U`, `M` or
+`D`) and the row's position, followed by the snapshot's usual columns. `M`
+(moved) and `D` rows only fill in the key columns. Rows are keyed by
+`(name, team)`, like `players_generator()`'s duplicate detection.
+
+Positions are only written for inserted rows and rows that moved: the
+largest set of rows that kept their relative order (ESPN re-ranks players
+between exports, but most keep their place relative to each other) is left
+without one and fills in the remaining slots in order.
+
+`reconstruct()` rebuilds any snapshot, in its original row order, from the
+nearest keyframe before it plus the deltas in between. To read a whole
+chain, `iter_chain()` walks it applying each delta once.
+"""
+
+import bisect
+import collections
+import csv
+import logging
+import os
+
+
+KEY_COLUMNS = ('name', 'team')
+
+OP_INSERT = 'I'
+OP_UPDATE = 'U'
+OP_MOVE = 'M'
+OP_DELETE = 'D'
+
+DELTA_COLUMNS = ['op', 'position']
+
+PREFIX = 'players-'
+EXT_KEYFRAME = '.csv'
+EXT_DELTA = '.delta'
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidChainError(Exception):
+    pass
+
+
+def _get_key_indexes(header_row):
+    return [header_row.index(column) for column in KEY_COLUMNS]
+
+
+def _get_key(row, key_indexes):
+    return tuple(row[index] for index in key_indexes)
+
+
+def read_keyframe(filename):
+    """`(header_row, {key: row})` of a regular snapshot CSV, in file order
+    """
+    with open(filename, 'r') as fp:
+        reader = csv.reader(fp)
+        header_row = next(reader)
+        key_indexes = _get_key_indexes(header_row)
+        rows = collections.OrderedDict()
+        for row in reader:
+            rows[_get_key(row, key_indexes)] = row
+    return header_row, rows
+
+
+def apply_delta(header_row, rows, filename):
+    """Applies delta `filename` to `rows` (as returned by `read_keyframe()`)
+    in place
+    """
+    with open(filename, 'r') as fp:
+        reader = csv.reader(fp)
+        if next(reader) != DELTA_COLUMNS + header_row:
+            raise InvalidChainError("Delta `%s` doesn't match its keyframe's "
+                                    "columns" % filename)
+        key_indexes = _get_key_indexes(header_row)
+        moved = {}
+        for row in reader:
+            op, position, row = row[0], row[1], row[2:]
+            key = _get_key(row, key_indexes)
+            if op == OP_DELETE:
+                rows.pop(key, None)
+            elif op != OP_MOVE:
+                rows[key] = row
+            if position:
+                moved[int(position)] = key
+    if moved:
+        _reorder(rows, moved, filename)
+    return rows
+
+
+def _reorder(rows, moved, filename):
+    """Puts the rows in `moved` (`{position: key}`) at their positions and
+    the others, in their current order, in the slots left over
+    """
+    moved_keys = set(moved.values())
+    if len(moved_keys) != len(moved) or max(moved) >= len(rows) or \
+            not moved_keys.issubset(rows):
+        raise InvalidChainError("Delta `%s` has invalid positions" % filename)
+    unmoved_keys = iter([key for key in rows if key not in moved_keys])
+    ordered_rows = collections.OrderedDict()
+    for position in range(len(rows)):
+        key = moved[position] if position in moved else next(unmoved_keys)
+        ordered_rows[key] = rows[key]
+    rows.clear()
+    rows.update(ordered_rows)
+
+
+def _get_unmoved_keys(previous_rows, rows):
+    """The largest set of keys in both `previous_rows` and `rows` that are
+    in the same relative order in each (a longest increasing subsequence of
+    previous positions, taken in `rows` order)
+    """
+    previous_positions = dict((key, position)
+                              for position, key in enumerate(previous_rows))
+    keys = [key for key in rows if key in previous_positions]
+    # The last index of the best run of each length, and its position
+    tails = []
+    tail_positions = []
+    parents = [None] * len(keys)
+    for index, key in enumerate(keys):
+        position = previous_positions[key]
+        length = bisect.bisect_left(tail_positions, position)
+        if length:
+            parents[index] = tails[length - 1]
+        if length == len(tails):
+            tails.append(index)
+            tail_positions.append(position)
+        else:
+            tails[length] = index
+            tail_positions[length] = position
+    unmoved_keys = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        unmoved_keys.add(keys[index])
+        index = parents[index]
+    return unmoved_keys
+
+
+def diff(previous_rows, rows):
+    """`(op, position, row)` tuples turning `previous_rows` into `rows`,
+    rows in order included (`position` is `None` for rows that kept their
+    place)
+    """
+    unmoved_keys = _get_unmoved_keys(previous_rows, rows)
+    ops = []
+    for position, (key, row) in enumerate(rows.items()):
+        previous_row = previous_rows.get(key)
+        if key in unmoved_keys:
+            position = None
+        if previous_row is None:
+            ops.append((OP_INSERT, position, row))
+        elif previous_row != row:
+            ops.append((OP_UPDATE, position, row))
+        elif position is not None:
+            ops.append((OP_MOVE, position, row))
+    for key, previous_row in previous_rows.items():
+        if key not in rows:
+            ops.append((OP_DELETE, None, previous_row))
+    return ops
+
+
+def write_delta(filename, header_row, ops):
+    key_indexes = _get_key_indexes(header_row)
+    with open(filename, 'w') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(DELTA_COLUMNS + header_row)
+        for op, position, row in ops:
+            if op in (OP_MOVE, OP_DELETE):
+                key_row = [''] * len(header_row)
+                for index in key_indexes:
+                    key_row[index] = row[index]
+                row = key_row
+            writer.writerow([op, '' if position is None else position] + row)
+
+
+def get_chain(dir_name):
+    """Every (non-empty) keyframe and delta in `dir_name`, oldest first
+    """
+    filenames = []
+    for filename in os.listdir(dir_name):
+        if not filename.startswith(PREFIX):
+            continue
+        if not filename.endswith(EXT_KEYFRAME) and \
+                not filename.endswith(EXT_DELTA):
+            continue
+        path = os.path.join(dir_name, filename)
+        if not os.path.getsize(path):
+            continue
+        filenames.append(path)
+    return sorted(filenames)
+
+
+def is_delta(filename):
+    return filename.endswith(EXT_DELTA)
+
+
+def get_num_deltas_since_keyframe(chain):
+    num_deltas = 0
+    for filename in reversed(chain):
+        if not is_delta(filename):
+            return num_deltas
+        num_deltas += 1
+    return None
+
+
+def iter_chain(filenames):
+    """Yields `(filename, header_row, {key: row})` for each snapshot of
+    `filenames` (a keyframe and the deltas after it, or several such runs,
+    as `get_chain()` lists them), applying each delta once
+
+    The rows dict is updated in place as the walk goes on: copy it to keep
+    a snapshot around.
+    """
+    header_row = rows = None
+    for filename in filenames:
+        if not is_delta(filename):
+            header_row, rows = read_keyframe(filename)
+        elif rows is None:
+            raise InvalidChainError("No keyframe before `%s`" % filename)
+        else:
+            apply_delta(header_row, rows, filename)
+        yield filename, header_row, rows
+
+
+def reconstruct(filename):
+    """`(header_row, {key: row})` of snapshot `filename` - a keyframe or a
+    delta
+    """
+    chain = get_chain(os.path.dirname(filename) or '.')
+    basenames = [os.path.basename(path) for path in chain]
+    try:
+        position = basenames.index(os.path.basename(filename))
+    except ValueError:
+        raise InvalidChainError("`%s` isn't part of a chain" % filename)
+    start = position
+    while is_delta(chain[start]):
+        if not start:
+            raise InvalidChainError("No keyframe before `%s`" % filename)
+        start -= 1
+    for _, header_row, rows in iter_chain(chain[start:position + 1]):
+        pass
+    return header_row, rows
+
+
+def make_delta(previous_filename, filename, delta_filename):
+    """Writes the delta between (reconstructed) snapshot `previous_filename`
+    and regular snapshot `filename` to `delta_filename`
+
+    Returns `False` (without writing anything) when the columns changed, in
+    which case `filename` has to stay a keyframe.
+    """
+    previous_header_row, previous_rows = reconstruct(previous_filename)
+    header_row, rows = read_keyframe(filename)
+    if header_row != previous_header_row:
+        logger.info("Columns changed since `%s`, keeping keyframe",
+                    previous_filename)
+        return False
+    ops = diff(previous_rows, rows)
+    write_delta(delta_filename, header_row, ops)
+    logger.info("Wrote delta of %s of %s rows to %s",
+                len(ops),
+                len(rows),
+                delta_filename)
+    return True
@@ -1,13 +1,23 @@
 
+import collections
+import hashlib
 import json
 import logging
+from multiprocessing.pool import ThreadPool
 import re
+import time
 
-from bs4 import BeautifulSoup
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 from unidecode import unidecode
 
 from fantasyfootball.base_team import BaseTeam
+from fantasyfootball.identity import get_team_abbreviation
+from fantasyfootball.metrics import NULL_METRICS
+from fantasyfootball.parsers import get_parser
+from fantasyfootball.player import coerce_numeric, Player, PLAYER_KEYS
+from fantasyfootball.ratelimit import raise_for_status
 
 LOGIN_URL_GET = 'http://games.espn.com/frontpage/football'
 LOGIN_URL_POST = 'https://registerdisney.go.com/jgc/v2/client/ESPN-FANTASYLM-PROD/guest/login?langPref=en-US'
@@ -15,9 +25,40 @@ TEAM_URL_TEMPLATE = 'http://games.espn.com/ffl/clubhouse?leagueId=%s&teamId=%s&s
 URL_TEMPLATE_PLAYERS = 'http://games.espn.com/ffl/playertable/prebuilt/freeagency?leagueId=%s&teamId=%s&seasonId=%s&avail=-1&context=freeagency&view=overview&startIndex=%s'
 URL_TEMPLATE_SCOREBOARD = 'http://games.espn.com/ffl/scoreboard?leagueId=%s&seasonId=%s'
 
-# PARSER = 'lxml'
+PLAYERS_PER_PAGE = 50
+
+# Connection pool defaults for `make_session()`
+POOL_SIZE = 10
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# One of: 'html5lib', 'lxml', 'lxml-xpath', 'lxml-stream' (see `fantasyfootball.parsers`)
 PARSER = 'html5lib'
 
+# Per-row parsing is only logged at DEBUG, for every Nth row of a page -
+# logging each row costs more than parsing it
+ROW_DEBUG_EVERY = 10
+
+# `owner` of players nobody has on their roster: `FA`, or `WA (Wed)` and the
+# like while they're on waivers (a team can be called `WALT`, so only that
+# exact form counts)
+FREE_AGENT_OWNER = 'FA'
+WAIVERS_OWNER = 'WA'
+WAIVERS_OWNER_PREFIX = 'WA ('
+
+# Seconds between `watch_scoreboard()` polls
+SCOREBOARD_WATCH_INTERVAL = 30
+
+# Start tag of a scoreboard matchup (`<table class="ptsBased matchup">`), and
+# the open/close tags to balance to find its end - see `split_matchups()`
+MATCHUP_START_REGEX = re.compile(
+    br'<(table|div)\b[^>]*\bclass="[^"]*\bmatchup\b', re.IGNORECASE)
+MATCHUP_TAG_REGEXES = {
+    b'table': re.compile(br'<(/?)table\b', re.IGNORECASE),
+    b'div': re.compile(br'<(/?)div\b', re.IGNORECASE),
+}
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,14 +66,162 @@ class InvalidPlayerIdError(Exception):
     pass
 
 
+def make_session(pool_size=POOL_SIZE, max_retries=MAX_RETRIES,
+                 retry_statuses=RETRY_STATUSES):
+    """`requests.Session` with a keep-alive pool of up to `pool_size`
+    connections per host, retrying connection errors and `retry_statuses`
+    responses with exponential backoff - meant to be shared by several
+    `ESPNTeam`s
+
+    Pass `retry_statuses=()` when a `RateLimiter` does the status retries.
+    """
+    retries = Retry(total=max_retries,
+                    backoff_factor=RETRY_BACKOFF_FACTOR,
+                    status_forcelist=retry_statuses)
+    if not retry_statuses:
+        # Newer urllib3s retry 413/429/503 responses with a `Retry-After`
+        # header no matter what `status_forcelist` says
+        retries.respect_retry_after_header = False
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retries)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def is_free_agent(owner):
+    return not owner or owner in (FREE_AGENT_OWNER, WAIVERS_OWNER) or \
+        owner.startswith(WAIVERS_OWNER_PREFIX)
+
+
+class Snapshot(object):
+    """One pull of the league, see `ESPNTeam.snapshot()`:
+
+    - `players`: every player, as `players_generator()` yields them
+    - `rosters`: `{owner: [player, ...]}`, for every rostered player
+    - `team`: this team's roster as `(slot, player)` pairs, in clubhouse
+      order
+    """
+
+    def __init__(self, players, rosters, team):
+        self.players = players
+        self.rosters = rosters
+        self.team = team
+
+    def __repr__(self):
+        return '<Snapshot: %s players, %s rosters>' % (len(self.players),
+                                                       len(self.rosters))
+
+
+def split_matchups(content):
+    """The scoreboard page's matchups as raw HTML fragments (one per
+    `class="matchup"` element, nested tags included), found with a scan for
+    tags rather than a parse - `None` if a matchup doesn't seem to end
+    """
+    fragments = []
+    position = 0
+    while True:
+        start = MATCHUP_START_REGEX.search(content, position)
+        if start is None:
+            return fragments
+        tag_regex = MATCHUP_TAG_REGEXES[start.group(1).lower()]
+        depth = 0
+        end = None
+        for tag in tag_regex.finditer(content, start.start()):
+            depth += -1 if tag.group(1) else 1
+            if not depth:
+                end = content.find(b'>', tag.end()) + 1
+                break
+        if not end:
+            return None
+        fragments.append(content[start.start():end])
+        position = end
+
+
+def _walk_matchup(matchup):
+    """Everything `ESPNTeam._parse_matchup()` needs from a matchup, in one
+    walk of its subtree (rather than a `find_all()` per piece):
+
+    - `score`, `record`, `owners`: elements with that class
+    - `name_links`: the first link in each `name` element
+    - `labels`: the divs in the first `labels` element
+    - `players_played`: the divs in each `playersPlayed` element
+    """
+    found = {
+        'score': [],
+        'record': [],
+        'owners': [],
+        'name_links': [],
+        'labels': None,
+        'players_played': [],
+    }
+    _walk_matchup_children(matchup, found, None, False)
+    return found
+
+
+def _walk_matchup_children(element, found, divs, in_name):
+    for child in element.children:
+        if child.name is None:
+            # Text, comments
+            continue
+        if divs is not None and child.name == 'div':
+            divs.append(child)
+        if in_name and child.name == 'a' and found['name_links'][-1] is None:
+            found['name_links'][-1] = child
+        child_divs = divs
+        child_in_name = in_name
+        for class_name in child.get('class') or ():
+            if class_name in ('score', 'record', 'owners'):
+                found[class_name].append(child)
+            elif class_name == 'name':
+                found['name_links'].append(None)
+                child_in_name = True
+            elif class_name == 'labels' and found['labels'] is None:
+                found['labels'] = child_divs = []
+            elif class_name == 'playersPlayed':
+                child_divs = []
+                found['players_played'].append(child_divs)
+        _walk_matchup_children(child, found, child_divs, child_in_name)
+
+
+def _diff_matchup_team(previous, team):
+    """The fields of a scoreboard team (`data` being a dict of its own) that
+    differ from `previous` - all of them if there's no `previous`
+    """
+    if previous is None:
+        return team
+    changes = dict((key, value) for key, value in team.items()
+                   if key != 'data' and previous.get(key) != value)
+    data = dict((label, value) for label, value in team['data'].items()
+                if previous['data'].get(label) != value)
+    if data:
+        changes['data'] = data
+    return changes
+
+
 class ESPNTeam(BaseTeam):
     PLAYER_INFO_ADV_OPP_BYE = '** BYE **'
 
-    def __init__(self, league_id, team_id, season_id):
+    def __init__(self, league_id, team_id, season_id, parser=PARSER,
+                 cache=None, typed=False, session=None, rate_limiter=None,
+                 metrics=None):
         self.league_id = league_id
         self.team_id = team_id
         self.season_id = season_id
-        self.session = requests.Session()
+        # Pass a `make_session()` session to share connections between teams
+        self.session = session or requests.Session()
+        self.parser = get_parser(parser)
+        # Optional `fantasyfootball.cache.ResponseCache`
+        self.cache = cache
+        # Convert numeric stat columns to int/float/None at scrape time
+        self.typed = typed
+        # Optional `fantasyfootball.ratelimit.RateLimiter`, can be shared
+        # between teams
+        self.rate_limiter = rate_limiter
+        # Optional `fantasyfootball.metrics.Metrics` for per-stage timings
+        self.metrics = metrics or NULL_METRICS
 
     @staticmethod
     def parse_params_from_url(url):
@@ -62,14 +251,48 @@ class ESPNTeam(BaseTeam):
         # For now, using this cookie method
         self.cookie = cookie
 
+    def _get(self, url, headers):
+        """GET `url`, raising `FetchError` rather than returning an error
+        page (which would parse as "no players")
+        """
+        if self.rate_limiter:
+            response = self.rate_limiter.get(self.session, url,
+                                             headers=headers)
+        else:
+            response = self.session.get(url, headers=headers)
+        raise_for_status(url, response)
+        return response
+
+    def _fetch(self, url):
+        headers = {'Cookie': self.cookie}
+        with self.metrics.timer('fetch'):
+            if self.cache:
+                content = self.cache.fetch(self.session, url, headers,
+                                           get=self._get)
+            else:
+                content = self._get(url, headers).content
+        self.metrics.count('pages_fetched')
+        self.metrics.count('bytes_fetched', len(content))
+        return content
+
+    def _parse_player_rows(self, content):
+        with self.metrics.timer('parse_rows'):
+            player_rows = self.parser.player_rows(content)
+        self.metrics.count('rows_found', len(player_rows))
+        return player_rows
+
+    def _get_team_url(self):
+        return TEAM_URL_TEMPLATE % (self.league_id,
+                                    self.team_id,
+                                    self.season_id)
+
+    def _get_team_page(self):
+        return self._fetch(self._get_team_url())
+
     def _get_team_soup(self):
         """Helpful for debugging
         """
-        url = TEAM_URL_TEMPLATE % (self.league_id,
-                                   self.team_id,
-                                   self.season_id)
-        response = self.session.get(url, headers={'Cookie': self.cookie})
-        return BeautifulSoup(response.content, PARSER)
+        return self.parser.soup(self._get_team_page())
 
     def _parse_player_info_basic(self, player_info_str):
         """http://stackoverflow.com/questions/4995116/only-extracting-text-from-this-element-not-its-children/4995480#4995480
@@ -94,10 +317,9 @@ class ESPNTeam(BaseTeam):
         name1, name2, pos = player_info_str.split()
         return {
             'name': u" ".join([name1, name2]),
-            # TODO: Fill in team
-            # (Player has team listed next to their name like: `NYJ` but D/ST
-            # have full team name listed like: `Browns`)
-            'team': None,
+            # Players have their team listed like `NYJ`, D/ST only have the
+            # nickname (`Browns`) - abbreviated like that season's players
+            'team': get_team_abbreviation(name1, self.season_id),
             'pos': pos,
             'status': u"OK",
         }
@@ -139,14 +361,17 @@ class ESPNTeam(BaseTeam):
         """Method for getting players on your team
         """
         logger.info("get_team()")
-        soup = self._get_team_soup()
+        return self._parse_team_page(self._get_team_page())
+
+    def _parse_team_page(self, content):
+        player_rows = self._parse_player_rows(content)
         players = []
-        player_rows = soup.find_all('tr', "pncPlayerRow")
-        for player_num, player_row in enumerate(player_rows, start=1):
-            logger.info("Grabbing player %s of %s ...",
-                        player_num,
-                        len(player_rows))
-            player_cols = player_row.find_all('td')
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for player_num, player_cols in enumerate(player_rows, start=1):
+            if debug and player_num % ROW_DEBUG_EVERY == 1:
+                logger.debug("Grabbing player %s of %s ...",
+                             player_num,
+                             len(player_rows))
             if not player_cols:
                 continue
             player_info = player_cols[1].text
@@ -169,21 +394,35 @@ class ESPNTeam(BaseTeam):
                 'pct_own': player_cols[15].text,
                 'plus_minus': player_cols[16].text,
             })
+            if self.typed:
+                coerce_numeric(player)
             players.append(player)
+        logger.info("Got %s players on the team from %s rows",
+                    len(players), len(player_rows))
         return players
 
+    def _get_players_url(self, offset=0):
+        return URL_TEMPLATE_PLAYERS % (self.league_id,
+                                       self.team_id,
+                                       self.season_id,
+                                       offset)
+
+    def _get_players_page(self, offset=0):
+        logger.info("Grabbing player page at offset %s", offset)
+        url = self._get_players_url(offset)
+        logger.debug("URL: %s", url)
+        return self._fetch(url)
+
     def _get_players_soup_piece(self, offset=0):
-        logger.info("Grabbing player soup piece at offset %s", offset)
-        url = URL_TEMPLATE_PLAYERS % (self.league_id,
-                                      self.team_id,
-                                      self.season_id,
-                                      offset)
-        logger.info("URL: %s", url)
-        response = self.session.get(url, headers={'Cookie': self.cookie})
-        return BeautifulSoup(response.content, PARSER)
+        """Helpful for debugging
+        """
+        return self.parser.soup(self._get_players_page(offset))
+
+    def _get_players_rows_piece(self, offset=0):
+        return self._parse_player_rows(self._get_players_page(offset))
 
     def get_header_row(self, player):
-        KEYS_DESIRED = "name,team,pos,status,owner,opp,home_away,status_et,prk,pts,avg,last,proj,oprk,pct_st,pct_own,plus_minus".split(',')
+        KEYS_DESIRED = PLAYER_KEYS
         logger.info("Getting header row based on %s desired keys: %s",
                     len(KEYS_DESIRED),
                     KEYS_DESIRED)
@@ -205,107 +444,365 @@ class ESPNTeam(BaseTeam):
         logger.info("Got header row w/ %s keys", len(header_row))
         return header_row
 
-    def players_generator(self, max_num_requests=None):
-        logger.info("players_generator()")
+    def _players_rows_pieces(self, max_num_requests=None):
+        """Yields `(offset, player_rows)` pairs one page at a time, in offset
+        order
+        """
         offset = num_requests = 0
-        players_seen = set()
         while True:
             if max_num_requests and num_requests >= max_num_requests:
                 logger.info("Hit max_num_requests of %s", max_num_requests)
                 return
-            players_this_time = 0
-            soup = self._get_players_soup_piece(offset)
+            player_rows = self._get_players_rows_piece(offset)
             num_requests += 1
-            player_rows = soup.find_all('tr', "pncPlayerRow")
-            for player_num, player_row in enumerate(player_rows, start=1):
-                logger.info("Grabbing player %s of %s ...",
-                            player_num,
-                            len(player_rows))
-                player_cols = player_row.find_all('td')
-                if not player_cols:
-                    continue
-                player_info = player_cols[0].text
-                player_info = player_info and player_info.strip()
-                if not player_info:
-                    continue
-                try:
+            yield offset, player_rows
+            offset += PLAYERS_PER_PAGE
+
+    def _players_rows_pieces_concurrent(self, concurrency,
+                                        max_num_requests=None):
+        """Like `_players_rows_pieces()`, but keeps up to `concurrency` page
+        requests in flight at once
+
+        Pages are still yielded in offset order. A new page is only scheduled
+        when the consumer asks for the next one, so once the consumer stops
+        (empty or duplicate page) nothing else gets requested, and whatever
+        is still in flight is thrown away.
+        """
+        pool = ThreadPool(concurrency)
+        pending = collections.deque()
+        offset = num_requests = 0
+        try:
+            while True:
+                while len(pending) < concurrency and \
+                        not (max_num_requests and
+                             num_requests >= max_num_requests):
+                    result = pool.apply_async(self._get_players_rows_piece,
+                                              (offset,))
+                    pending.append((offset, result))
+                    num_requests += 1
+                    offset += PLAYERS_PER_PAGE
+                if not pending:
+                    logger.info("Hit max_num_requests of %s",
+                                max_num_requests)
+                    return
+                page_offset, result = pending.popleft()
+                yield page_offset, result.get()
+        finally:
+            pool.terminate()
+
+    def _players_from_rows(self, player_rows):
+        metrics = self.metrics
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for player_num, player_cols in enumerate(player_rows, start=1):
+            if debug and player_num % ROW_DEBUG_EVERY == 1:
+                logger.debug("Grabbing player %s of %s ...",
+                             player_num,
+                             len(player_rows))
+            if not player_cols:
+                continue
+            player_info = player_cols[0].text
+            player_info = player_info and player_info.strip()
+            if not player_info:
+                continue
+            try:
+                with metrics.timer('parse_player_basic'):
                     player = self._parse_player_info_basic(player_info)
-                except:
-                    logger.exception("Error parsing player_info: %s",
-                                     player_info)
-                    continue
-                try:
+            except:
+                metrics.count('parse_failures')
+                logger.exception("Error parsing player_info: %s",
+                                 player_info)
+                continue
+            try:
+                with metrics.timer('parse_player_advanced'):
                     player_info_advanced = self._parse_player_info_advanced(player_cols)
-                except:
-                    logger.exception("Error parsing advanced player info. player_cols: %s /// player_row: %s",
-                                     player_cols,
-                                     player_row)
-                    continue
-                player.update(player_info_advanced)
-                player_hash = (player['name'], player['team'])
-                if player_hash in players_seen:
-                    logger.warning("We already saw %s !", player_hash)
-                    return
+            except:
+                metrics.count('parse_failures')
+                logger.exception("Error parsing advanced player info. player_cols: %s",
+                                 player_cols)
+                continue
+            player = Player.from_dicts(player, player_info_advanced)
+            if self.typed:
+                with metrics.timer('coerce_numeric'):
+                    coerce_numeric(player)
+            metrics.count('players_parsed')
+            yield player
+
+    def players_generator(self, max_num_requests=None, concurrency=None):
+        """Yields every player in the league, page by page
+
+        Pass `concurrency` > 1 to fetch that many pages at once - players
+        still come out in the same order as the serial version.
+        """
+        logger.info("players_generator()")
+        if concurrency and concurrency > 1:
+            pieces = self._players_rows_pieces_concurrent(concurrency,
+                                                          max_num_requests)
+        else:
+            pieces = self._players_rows_pieces(max_num_requests)
+        players_seen = set()
+        for offset, player_rows in pieces:
+            players, done = self._new_players_from_rows(offset,
+                                                        player_rows,
+                                                        players_seen)
+            for player in players:
                 yield player
-                players_seen.add(player_hash)
-                players_this_time += 1
-            logger.info("Offset: %s, got %s players", offset, players_this_time)
-            # if players_this_time < 50:
-            #     logger.info("Only got %s players (less than 50) - all done here",
-            #                 players_this_time)
-            #     return
-            if not players_this_time:
-                logger.info("Didn't get any players! All done here")
+            if done:
                 return
-            offset += 50
 
-    def get_players(self, max_num_requests=None):
+    def _new_players_from_rows(self, offset, player_rows, players_seen):
+        """`(players, done)` for one page: its players up to the first one
+        already in `players_seen` (which gets updated), and whether that was
+        the last page worth fetching
+        """
+        players = []
+        for player in self._players_from_rows(player_rows):
+            player_hash = (player['name'], player['team'])
+            if player_hash in players_seen:
+                self.metrics.count('duplicate_players')
+                logger.warning("We already saw %s !", player_hash)
+                return players, True
+            players.append(player)
+            players_seen.add(player_hash)
+        players_this_time = len(players)
+        logger.info("Offset: %s, got %s players from %s rows",
+                    offset, players_this_time, len(player_rows))
+        # if players_this_time < 50:
+        #     logger.info("Only got %s players (less than 50) - all done here",
+        #                 players_this_time)
+        #     return players, True
+        if not players_this_time:
+            logger.info("Didn't get any players! All done here")
+            return players, True
+        return players, False
+
+    def get_players(self, max_num_requests=None, concurrency=None):
         logger.info("get_players()")
-        return list(self.players_generator(max_num_requests))
+        return list(self.players_generator(max_num_requests, concurrency))
+
+    def snapshot(self, max_num_requests=None, concurrency=None):
+        """Every player, every owner's roster and this team's roster, from
+        one pass over the free-agency pages (see `Snapshot`)
+
+        The free-agency pages already list every rostered player with their
+        owner, so the clubhouse page is only parsed for what it alone has:
+        the roster slots.
+        """
+        logger.info("snapshot()")
+        slots = self._parse_team_slots(self._get_team_page())
+        players = self.players_generator(max_num_requests, concurrency)
+        return self._build_snapshot(slots, players)
+
+    def _parse_team_slots(self, content):
+        """`[(slot, (name, team)), ...]` for the clubhouse page's players
+        """
+        slots = []
+        for player_cols in self._parse_player_rows(content):
+            if not player_cols:
+                continue
+            player_info = player_cols[1].text
+            player_info = player_info and player_info.strip()
+            if not player_info:
+                continue
+            slot = player_cols[0] and player_cols[0].text
+            player = self._parse_player_info_basic(player_info)
+            slots.append((slot, (player['name'], player['team'])))
+        return slots
+
+    def _build_snapshot(self, slots, players):
+        slot_indexes = dict((key, index)
+                            for index, (_, key) in enumerate(slots))
+        team = [None] * len(slots)
+        all_players = []
+        rosters = collections.defaultdict(list)
+        for player in players:
+            all_players.append(player)
+            if not is_free_agent(player['owner']):
+                rosters[player['owner']].append(player)
+            index = slot_indexes.get((player['name'], player['team']))
+            if index is not None:
+                team[index] = (slots[index][0], player)
+        missing = [key for (_, key), entry in zip(slots, team) if entry is None]
+        if missing:
+            logger.warning("%s players on the team weren't in the free-agency "
+                           "pages: %s", len(missing), missing)
+        logger.info("Snapshot: %s players, %s rosters, %s on the team",
+                    len(all_players), len(rosters), len(team) - len(missing))
+        return Snapshot(all_players,
+                        dict(rosters),
+                        [entry for entry in team if entry is not None])
 
     def get_scoreboard(self):
-        soup = self._get_scoreboard_soup_piece()
-        matchups = soup.find_all(class_='matchup')
-        results = []
-        for matchup in matchups:
-            names = [name.find('a').text for name in matchup.find_all(class_='name')]
-            assert len(names) == 2
-            scores = [score.text for score in matchup.find_all(class_='score')]
-            assert len(scores) == 2
-            records = [record.text for record in matchup.find_all(class_='record')]
-            assert len(records) == 2
-            owners = [owner.text for owner in matchup.find_all(class_='owners')]
-            assert len(owners) == 2
-            details = matchup.find(class_='scoringDetails')
-            labels = self._get_details_labels(details)
-            matchup_teams_data = details.find_all(class_='playersPlayed')
-            assert len(matchup_teams_data) == 2
-            team1 = self._get_matchup_team_data(names[0],
-                                                scores[0],
-                                                records[0],
-                                                owners[0],
-                                                labels,
-                                                matchup_teams_data[0])
-            team2 = self._get_matchup_team_data(names[1],
-                                                scores[1],
-                                                records[1],
-                                                owners[1],
-                                                labels,
-                                                matchup_teams_data[1])
-            result = [team1, team2]
-            results.append(result)
-        return results
+        return self._parse_scoreboard(self._get_scoreboard_soup_piece())
+
+    def _parse_scoreboard(self, soup):
+        with self.metrics.timer('parse_scoreboard'):
+            return self._parse_scoreboard_matchups(soup)
+
+    def _parse_scoreboard_matchups(self, soup):
+        return [self._parse_matchup(matchup)
+                for matchup in soup.find_all(class_='matchup')]
+
+    def _parse_matchup(self, matchup):
+        found = _walk_matchup(matchup)
+        names = [link.text for link in found['name_links']]
+        assert len(names) == 2
+        scores = [score.text for score in found['score']]
+        assert len(scores) == 2
+        records = [record.text for record in found['record']]
+        assert len(records) == 2
+        owners = [owner.text for owner in found['owners']]
+        assert len(owners) == 2
+        assert found['labels'] is not None
+        labels = [self._get_label_div_title(div) for div in found['labels']]
+        matchup_teams_divs = found['players_played']
+        assert len(matchup_teams_divs) == 2
+        team1 = self._get_matchup_team_data(names[0],
+                                            scores[0],
+                                            records[0],
+                                            owners[0],
+                                            labels,
+                                            matchup_teams_divs[0])
+        team2 = self._get_matchup_team_data(names[1],
+                                            scores[1],
+                                            records[1],
+                                            owners[1],
+                                            labels,
+                                            matchup_teams_divs[1])
+        return [team1, team2]
+
+    def watch_scoreboard(self, interval=SCOREBOARD_WATCH_INTERVAL,
+                         max_polls=None):
+        """Polls the scoreboard every `interval` seconds, yielding a list of
+        changes whenever there are any:
+
+            for changes in team.watch_scoreboard(interval=10):
+                for change in changes:
+                    print(change['matchup'], change['name'], change['changes'])
+
+        Each change holds a team's matchup index, name and only the fields
+        that changed (`data` only holding the changed labels); the first
+        poll yields every team in full.
+
+        Polls are conditional requests (bypassing the response cache), an
+        unchanged body isn't parsed and only matchups whose HTML changed are
+        re-parsed.
+        """
+        url = self._get_scoreboard_url()
+        state = self._new_watch_state()
+        num_polls = 0
+        while True:
+            started_at = time.time()
+            changes = self._poll_scoreboard(url, state)
+            num_polls += 1
+            if changes:
+                yield changes
+            if max_polls and num_polls >= max_polls:
+                return
+            time.sleep(max(0, interval - (time.time() - started_at)))
+
+    def _new_watch_state(self):
+        return {
+            'validators': {},
+            'body_hash': None,
+            'fragment_hashes': [],
+            'matchups': [],
+        }
+
+    def _poll_scoreboard(self, url, state):
+        with self.metrics.timer('fetch'):
+            response = self._get(url, self._get_poll_headers(state))
+        content = self._read_poll_response(response, state)
+        if content is None:
+            return []
+        with self.metrics.timer('parse_scoreboard'):
+            return self._update_matchups(content, state)
+
+    def _get_poll_headers(self, state):
+        headers = {'Cookie': self.cookie}
+        headers.update(state['validators'])
+        return headers
+
+    def _read_poll_response(self, response, state):
+        """The body of a scoreboard poll's `response`, or `None` if it's
+        the same as last time; updates the validators in `state`
+        """
+        self.metrics.count('scoreboard_polls')
+        if response.status_code == 304:
+            self.metrics.count('scoreboard_not_modified')
+            return None
+        content = response.content
+        self.metrics.count('pages_fetched')
+        self.metrics.count('bytes_fetched', len(content))
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        state['validators'] = validators
+        body_hash = hashlib.sha1(content).hexdigest()
+        if body_hash == state['body_hash']:
+            self.metrics.count('scoreboard_unchanged')
+            return None
+        state['body_hash'] = body_hash
+        return content
+
+    def _update_matchups(self, content, state):
+        """Re-parses the matchups whose HTML changed since the last poll,
+        updates `state` and returns the changes
+        """
+        previous_hashes = state['fragment_hashes']
+        previous_matchups = state['matchups']
+        fragments = split_matchups(content)
+        if fragments is None:
+            logger.warning("Couldn't split the scoreboard into matchups, "
+                           "parsing all of it")
+            fragment_hashes = []
+            matchups = self._parse_scoreboard_matchups(
+                self.parser.soup(content))
+        else:
+            fragment_hashes = [hashlib.sha1(fragment).hexdigest()
+                               for fragment in fragments]
+            matchups = []
+            for index, fragment in enumerate(fragments):
+                if index < len(previous_hashes) and \
+                        previous_hashes[index] == fragment_hashes[index]:
+                    matchups.append(previous_matchups[index])
+                    continue
+                self.metrics.count('matchups_parsed')
+                soup = self.parser.soup(fragment)
+                matchups.append(self._parse_matchup(soup.find(class_='matchup')))
+        changes = []
+        for index, matchup in enumerate(matchups):
+            if index < len(previous_matchups):
+                previous_matchup = previous_matchups[index]
+            else:
+                previous_matchup = [None, None]
+            if matchup is previous_matchup:
+                continue
+            for team, previous_team in zip(matchup, previous_matchup):
+                team_changes = _diff_matchup_team(previous_team, team)
+                if team_changes:
+                    changes.append({
+                        'matchup': index,
+                        'name': team['name'],
+                        'changes': team_changes,
+                    })
+        state['fragment_hashes'] = fragment_hashes
+        state['matchups'] = matchups
+        return changes
+
+    def _get_scoreboard_url(self):
+        return URL_TEMPLATE_SCOREBOARD % (self.league_id, self.season_id)
 
     def _get_scoreboard_soup_piece(self):
         logger.info("Grabbing scoreboard soup piece")
-        url = URL_TEMPLATE_SCOREBOARD % (self.league_id, self.season_id)
-        logger.info("URL: %s", url)
-        response = self.session.get(url, headers={'Cookie': self.cookie})
-        return BeautifulSoup(response.content, PARSER)
+        url = self._get_scoreboard_url()
+        logger.debug("URL: %s", url)
+        return self._parse_soup(self._fetch(url))
 
-    def _get_details_labels(self, details):
-        labels_divs = details.find(class_='labels').find_all('div')
-        return [self._get_label_div_title(div) for div in labels_divs]
+    def _parse_soup(self, content):
+        with self.metrics.timer('parse_soup'):
+            return self.parser.soup(content)
 
     def _get_label_div_title(self, div):
         title = div.get('title')
@@ -317,7 +814,7 @@ class ESPNTeam(BaseTeam):
         return title
 
     def _get_matchup_team_data(self, name, score, record, owner, labels,
-                               team_data):
+                               divs):
         result = {
             'name': name,
             'score': score,
@@ -325,7 +822,6 @@ class ESPNTeam(BaseTeam):
             'owner': owner,
             'data': {},
         }
-        divs = team_data.find_all('div')
         assert len(labels) == len(divs)
         for label, div in zip(labels, divs):
             result['data'][label] = div.text
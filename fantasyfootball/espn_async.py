@@ -0,0 +1,280 @@
+"""asyncio version of `ESPNTeam`, on top of httpx
+
+Only the network side differs: the URLs, page parsing, player/matchup
+parsing, scoreboard change tracking and duplicate detection are all
+inherited from `ESPNTeam`, so both clients always produce the same players.
+Parsing is CPU-bound, so all of it (pages, players and matchups) runs in the
+loop's default executor to keep the event loop responsive. Every `ESPNTeam`
+method that fetches is overridden here as a coroutine.
+
+Requires Python 3 and httpx.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+import weakref
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from fantasyfootball.espn import ESPNTeam, PARSER, PLAYERS_PER_PAGE, \
+    SCOREBOARD_WATCH_INTERVAL
+from fantasyfootball.ratelimit import raise_for_status
+
+
+# One semaphore per `RateLimiter`, so teams sharing a limiter also share its
+# `max_concurrency`
+_request_slots = weakref.WeakKeyDictionary()
+
+logger = logging.getLogger(__name__)
+
+
+class MissingHttpxError(Exception):
+    pass
+
+
+def _require_httpx():
+    if httpx is None:
+        raise MissingHttpxError("AsyncESPNTeam requires httpx")
+
+
+def _get_request_slots(rate_limiter):
+    if not rate_limiter or not rate_limiter.max_concurrency:
+        return None
+    request_slots = _request_slots.get(rate_limiter)
+    if request_slots is None:
+        request_slots = asyncio.Semaphore(rate_limiter.max_concurrency)
+        _request_slots[rate_limiter] = request_slots
+    return request_slots
+
+
+class AsyncESPNTeam(ESPNTeam):
+    """Same interface as `ESPNTeam`, with `get_team()`, `get_players()`,
+    `snapshot()` and `get_scoreboard()` as coroutines and
+    `players_generator()` and `watch_scoreboard()` as async iterators:
+
+        async with AsyncESPNTeam(league_id, team_id, season_id) as team:
+            team.set_cookie(cookie)
+            async for player in team.players_generator(concurrency=4):
+                ...
+
+    Pass an `httpx.AsyncClient` as `client` to share its connection pool
+    between teams (it's then up to the caller to close it). A
+    `fantasyfootball.ratelimit.RateLimiter` can be shared the same way.
+    """
+
+    def __init__(self, league_id, team_id, season_id, parser=PARSER,
+                 typed=False, client=None, rate_limiter=None, metrics=None):
+        _require_httpx()
+        super(AsyncESPNTeam, self).__init__(league_id, team_id, season_id,
+                                            parser=parser, typed=typed,
+                                            rate_limiter=rate_limiter,
+                                            metrics=metrics)
+        self.owns_client = client is None
+        self.client = client or httpx.AsyncClient()
+        self.request_slots = _get_request_slots(rate_limiter)
+
+    async def aclose(self):
+        if self.owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def _get(self, url, headers):
+        if self.request_slots is None:
+            return await self.client.get(url, headers=headers)
+        async with self.request_slots:
+            return await self.client.get(url, headers=headers)
+
+    async def _fetch(self, url):
+        start = time.time()
+        content = await self._fetch_content(url)
+        self.metrics.add_time('fetch', time.time() - start)
+        self.metrics.count('pages_fetched')
+        self.metrics.count('bytes_fetched', len(content))
+        return content
+
+    async def _fetch_content(self, url):
+        """Async version of `ESPNTeam._get()` + `ESPNTeam._fetch()` (without
+        the response cache)
+        """
+        response = await self._get_response(url, {'Cookie': self.cookie})
+        return response.content
+
+    async def _get_response(self, url, headers):
+        """`_get()`, rate limited and retried like `ESPNTeam._get()`
+        """
+        limiter = self.rate_limiter
+        attempt = 0
+        while True:
+            if limiter:
+                await asyncio.sleep(limiter.reserve())
+            response = await self._get(url, headers)
+            delay = None
+            if limiter:
+                delay = limiter.on_response(
+                    url,
+                    response.status_code,
+                    response.headers.get('Retry-After'),
+                    attempt)
+            if delay is None:
+                raise_for_status(url, response)
+                return response
+            logger.warning("HTTP %s for %s, retrying in %.1fs",
+                           response.status_code, url, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _run_in_executor(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def _get_team_page(self):
+        return await self._fetch(self._get_team_url())
+
+    async def _get_team_soup(self):
+        """Helpful for debugging
+        """
+        content = await self._get_team_page()
+        return await self._run_in_executor(self._parse_soup, content)
+
+    async def get_team(self):
+        """Method for getting players on your team
+        """
+        logger.info("get_team()")
+        content = await self._get_team_page()
+        return await self._run_in_executor(self._parse_team_page, content)
+
+    async def snapshot(self, max_num_requests=None, concurrency=None):
+        logger.info("snapshot()")
+        content = await self._get_team_page()
+        slots = await self._run_in_executor(self._parse_team_slots, content)
+        players = [player async for player in
+                   self.players_generator(max_num_requests, concurrency)]
+        return self._build_snapshot(slots, players)
+
+    async def _get_scoreboard_soup_piece(self):
+        logger.info("Grabbing scoreboard soup piece")
+        content = await self._fetch(self._get_scoreboard_url())
+        return await self._run_in_executor(self._parse_soup, content)
+
+    async def get_scoreboard(self):
+        soup = await self._get_scoreboard_soup_piece()
+        return await self._run_in_executor(self._parse_scoreboard, soup)
+
+    async def watch_scoreboard(self, interval=SCOREBOARD_WATCH_INTERVAL,
+                               max_polls=None):
+        """Async iterator version of `ESPNTeam.watch_scoreboard()`:
+
+            async for changes in team.watch_scoreboard(interval=10):
+                ...
+        """
+        url = self._get_scoreboard_url()
+        state = self._new_watch_state()
+        num_polls = 0
+        while True:
+            started_at = time.time()
+            changes = await self._poll_scoreboard(url, state)
+            num_polls += 1
+            if changes:
+                yield changes
+            if max_polls and num_polls >= max_polls:
+                return
+            await asyncio.sleep(max(0, interval - (time.time() - started_at)))
+
+    async def _poll_scoreboard(self, url, state):
+        start = time.time()
+        response = await self._get_response(url,
+                                             self._get_poll_headers(state))
+        self.metrics.add_time('fetch', time.time() - start)
+        content = self._read_poll_response(response, state)
+        if content is None:
+            return []
+        start = time.time()
+        changes = await self._run_in_executor(self._update_matchups,
+                                              content, state)
+        self.metrics.add_time('parse_scoreboard', time.time() - start)
+        return changes
+
+    async def _get_players_page(self, offset=0):
+        logger.info("Grabbing player page at offset %s", offset)
+        return await self._fetch(self._get_players_url(offset))
+
+    async def _get_players_soup_piece(self, offset=0):
+        """Helpful for debugging
+        """
+        content = await self._get_players_page(offset)
+        return await self._run_in_executor(self._parse_soup, content)
+
+    async def _get_players_rows_piece(self, offset=0):
+        content = await self._get_players_page(offset)
+        return await self._run_in_executor(self._parse_player_rows, content)
+
+    def _players_rows_pieces_concurrent(self, concurrency,
+                                        max_num_requests=None):
+        """`_players_rows_pieces()`, which already keeps `concurrency`
+        requests in flight
+        """
+        return self._players_rows_pieces(concurrency, max_num_requests)
+
+    async def _players_rows_pieces(self, concurrency=1,
+                                   max_num_requests=None):
+        """Yields `(offset, player_rows)` pairs in offset order, keeping up
+        to `concurrency` page requests in flight (see
+        `ESPNTeam._players_rows_pieces_concurrent()`)
+        """
+        pending = collections.deque()
+        offset = num_requests = 0
+        try:
+            while True:
+                while len(pending) < concurrency and \
+                        not (max_num_requests and
+                             num_requests >= max_num_requests):
+                    task = asyncio.ensure_future(
+                        self._get_players_rows_piece(offset))
+                    pending.append((offset, task))
+                    num_requests += 1
+                    offset += PLAYERS_PER_PAGE
+                if not pending:
+                    logger.info("Hit max_num_requests of %s",
+                                max_num_requests)
+                    return
+                page_offset, task = pending.popleft()
+                yield page_offset, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def players_generator(self, max_num_requests=None,
+                                concurrency=None):
+        """Async iterator over every player in the league, page by page
+        """
+        logger.info("players_generator()")
+        pieces = self._players_rows_pieces(concurrency or 1, max_num_requests)
+        players_seen = set()
+        try:
+            async for offset, player_rows in pieces:
+                players, done = await self._run_in_executor(
+                    self._new_players_from_rows,
+                    offset,
+                    player_rows,
+                    players_seen)
+                for player in players:
+                    yield player
+                if done:
+                    return
+        finally:
+            await pieces.aclose()
+
+    async def get_players(self, max_num_requests=None, concurrency=None):
+        logger.info("get_players()")
+        return [player async for player in
+                self.players_generator(max_num_requests, concurrency)]
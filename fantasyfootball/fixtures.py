@@ -0,0 +1,246 @@
+"""Recorded ESPN pages, and a local HTTP stand-in that replays them
+
+A fixture set is a folder holding one file per recorded page plus an
+`index.json` mapping each page's path + query string to its file.
+
+`record()` captures the clubhouse, every free-agency page and the scoreboard
+for a team. `ReplayServer` serves a fixture set as an HTTP proxy, optionally
+with some latency, so the scraper runs against it untouched. Responses carry
+an `ETag` (a hash of the content), and a matching `If-None-Match` gets a
+304. `fail()` has a page answer with an error (a 429, say) a few times
+first, for testing retries:
+
+    server = ReplayServer('fixtures/my-league', latency=0.05)
+    server.start()
+    team = ESPNTeam(league_id, team_id, season_id)
+    team.session.proxies = {'http': server.url}
+    ...
+    server.stop()
+
+Usage:
+
+    python -m fantasyfootball.fixtures record <clubhouse url> <directory> --cookie <cookie>
+    python -m fantasyfootball.fixtures serve <directory> [--port N] [--latency S]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit
+
+from fantasyfootball.espn import ESPNTeam, PLAYERS_PER_PAGE
+
+
+INDEX_BASENAME = 'index.json'
+
+logger = logging.getLogger(__name__)
+
+
+def get_fixture_key(url):
+    """Path + query string: what a proxy request and a direct request for
+    the same page have in common
+    """
+    pieces = urlsplit(url)
+    if pieces.query:
+        return '%s?%s' % (pieces.path, pieces.query)
+    return pieces.path
+
+
+class FixtureWriter(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def add(self, url, content):
+        basename = '%03d.html' % len(self.index)
+        with open(os.path.join(self.directory, basename), 'wb') as fp:
+            fp.write(content)
+        self.index[get_fixture_key(url)] = basename
+
+    def save(self):
+        with open(os.path.join(self.directory, INDEX_BASENAME), 'w') as fp:
+            json.dump(self.index, fp, indent=2, sort_keys=True)
+
+
+def get_etag(content):
+    return '"%s"' % hashlib.sha1(content).hexdigest()
+
+
+def load_fixtures(directory):
+    """`{key: content}` for a fixture set
+    """
+    with open(os.path.join(directory, INDEX_BASENAME), 'r') as fp:
+        index = json.load(fp)
+    fixtures = {}
+    for key, basename in index.items():
+        with open(os.path.join(directory, basename), 'rb') as fp:
+            fixtures[key] = fp.read()
+    return fixtures
+
+
+def record(team, directory, max_pages=None):
+    """Saves `team`'s clubhouse, free-agency pages (up to and including the
+    first one without players) and scoreboard to `directory`
+    """
+    writer = FixtureWriter(directory)
+    for url in (team._get_team_url(), team._get_scoreboard_url()):
+        writer.add(url, team._fetch(url))
+    offset = num_pages = 0
+    while not (max_pages and num_pages >= max_pages):
+        url = team._get_players_url(offset)
+        content = team._fetch(url)
+        writer.add(url, content)
+        num_pages += 1
+        if not team.parser.player_rows(content):
+            break
+        offset += PLAYERS_PER_PAGE
+    writer.save()
+    logger.info("Recorded %s pages to %s", len(writer.index), directory)
+    return writer.index
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        replay = self.server.replay
+        replay.count_request()
+        if replay.latency:
+            time.sleep(replay.latency)
+        key = get_fixture_key(self.path)
+        failure = replay.pop_failure(key)
+        content = replay.fixtures.get(key)
+        if failure is not None:
+            status_code, headers = failure
+            self.send_response(status_code)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            content = b''
+        elif content is None:
+            logger.warning("No fixture for %s", self.path)
+            self.send_response(404)
+            content = b''
+        elif self.headers.get('If-None-Match') == get_etag(content):
+            self.send_response(304)
+            content = b''
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('ETag', get_etag(content))
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class ReplayServer(object):
+    """Serves a fixture set (a folder, or a `{key: content}` dict) over HTTP,
+    waiting `latency` seconds before each response
+    """
+
+    def __init__(self, fixtures, latency=0, host='127.0.0.1', port=0):
+        if not isinstance(fixtures, dict):
+            fixtures = load_fixtures(fixtures)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.num_requests = 0
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.server = _ThreadingHTTPServer((host, port), _ReplayHandler)
+        self.server.replay = self
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self.server.server_address[:2]
+
+    def count_request(self):
+        with self.lock:
+            self.num_requests += 1
+
+    def fail(self, key, status_code, times=1, headers=None):
+        """Answers the next `times` requests for fixture `key` with an empty
+        `status_code` response carrying `headers` (`Retry-After`, say)
+        """
+        with self.lock:
+            self.failures.setdefault(key, []).extend(
+                [(status_code, headers or {})] * times)
+
+    def pop_failure(self, key):
+        with self.lock:
+            failures = self.failures.get(key)
+            if not failures:
+                return None
+            return failures.pop(0)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay ESPN pages")
+    subparsers = parser.add_subparsers(dest='command')
+    parser_record = subparsers.add_parser('record')
+    parser_record.add_argument('url', help="Clubhouse or free agency URL")
+    parser_record.add_argument('directory')
+    parser_record.add_argument('--cookie', required=True)
+    parser_record.add_argument('--max-pages', type=int)
+    parser_serve = subparsers.add_parser('serve')
+    parser_serve.add_argument('directory')
+    parser_serve.add_argument('--port', type=int, default=8000)
+    parser_serve.add_argument('--latency', type=float, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'record':
+        team = ESPNTeam(**ESPNTeam.parse_params_from_url(args.url))
+        team.set_cookie(args.cookie)
+        record(team, args.directory, args.max_pages)
+    elif args.command == 'serve':
+        server = ReplayServer(args.directory,
+                              latency=args.latency,
+                              port=args.port)
+        logger.info("Replaying %s at %s (use it as an HTTP proxy)",
+                    args.directory, server.url)
+        server.server.serve_forever()
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
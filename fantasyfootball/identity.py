@@ -0,0 +1,248 @@
+"""Matching players across sources: ESPN snapshots and Rotoworld depth charts
+
+ESPN rows name their team with an abbreviation (`NYJ`, `Buf`) - or, for
+D/ST, only with a nickname (`Jets D/ST`) - while Rotoworld uses full names
+(`New York Jets`). Both are mapped to one abbreviation per franchise here
+(ESPN's as of 2016, so `SD` for the Chargers whatever the season), and
+player names are compared via `normalize_name()`. For the abbreviation ESPN
+itself uses in a given season, pass `season_id`.
+
+`DepthChartIndex` hashes a depth chart (`rotoworld/depth_charts.py`'s CSV)
+once, so joining it onto a snapshot is one dict lookup per row:
+
+    index = DepthChartIndex.from_csv('rotoworld/depth_charts.csv')
+    header_row, rows = index.join(header_row, rows)
+
+Usage:
+
+    python -m fantasyfootball.identity <players csv> <depth charts csv> <output csv>
+"""
+
+import argparse
+import csv
+import logging
+import re
+
+from unidecode import unidecode
+
+from fantasyfootball.player import to_text
+
+
+# (ESPN abbreviation as of 2016, city, nickname)
+TEAMS = (
+    (u'Ari', u'Arizona', u'Cardinals'),
+    (u'Atl', u'Atlanta', u'Falcons'),
+    (u'Bal', u'Baltimore', u'Ravens'),
+    (u'Buf', u'Buffalo', u'Bills'),
+    (u'Car', u'Carolina', u'Panthers'),
+    (u'Chi', u'Chicago', u'Bears'),
+    (u'Cin', u'Cincinnati', u'Bengals'),
+    (u'Cle', u'Cleveland', u'Browns'),
+    (u'Dal', u'Dallas', u'Cowboys'),
+    (u'Den', u'Denver', u'Broncos'),
+    (u'Det', u'Detroit', u'Lions'),
+    (u'GB', u'Green Bay', u'Packers'),
+    (u'Hou', u'Houston', u'Texans'),
+    (u'Ind', u'Indianapolis', u'Colts'),
+    (u'Jax', u'Jacksonville', u'Jaguars'),
+    (u'KC', u'Kansas City', u'Chiefs'),
+    (u'LA', u'Los Angeles', u'Rams'),
+    (u'Mia', u'Miami', u'Dolphins'),
+    (u'Min', u'Minnesota', u'Vikings'),
+    (u'NE', u'New England', u'Patriots'),
+    (u'NO', u'New Orleans', u'Saints'),
+    (u'NYG', u'New York', u'Giants'),
+    (u'NYJ', u'New York', u'Jets'),
+    (u'Oak', u'Oakland', u'Raiders'),
+    (u'Phi', u'Philadelphia', u'Eagles'),
+    (u'Pit', u'Pittsburgh', u'Steelers'),
+    (u'SD', u'San Diego', u'Chargers'),
+    (u'SF', u'San Francisco', u'49ers'),
+    (u'Sea', u'Seattle', u'Seahawks'),
+    (u'TB', u'Tampa Bay', u'Buccaneers'),
+    (u'Ten', u'Tennessee', u'Titans'),
+    (u'Wsh', u'Washington', u'Redskins'),
+)
+
+# Other spellings of the same teams (keys are lowercase)
+TEAM_ALIASES = {
+    u'jac': u'Jax',
+    u'lar': u'LA',
+    u'los angeles chargers': u'SD',
+    u'lac': u'SD',
+    u'lv': u'Oak',
+    u'las vegas raiders': u'Oak',
+    u'was': u'Wsh',
+}
+
+# Abbreviations ESPN switched to after a move: `{abbreviation:
+# ((first season, new abbreviation), ...)}`
+TEAM_RENAMES = {
+    u'LA': ((2017, u'LAR'),),
+    u'Oak': ((2020, u'LV'),),
+    u'SD': ((2017, u'LAC'),),
+}
+
+# Rotoworld depth chart position -> ESPN position (the others, e.g. the
+# offensive line, are kept as they are)
+DEPTH_CHART_POSITIONS = {
+    u'WR1': u'WR',
+    u'WR2': u'WR',
+    u'WR3': u'WR',
+    u'3RB': u'RB',
+    u'GLB': u'RB',
+    u'FB': u'RB',
+}
+
+DEPTH_CHART_COLUMNS = ('depth_chart_pos', 'depth')
+
+# ESPN marks some players with `*`; suffixes are left off by some sources
+NAME_JUNK_REGEX = re.compile(r"[*.,'`]")
+NAME_SUFFIX_REGEX = re.compile(r'\s+(jr|sr|ii|iii|iv|v)$')
+
+logger = logging.getLogger(__name__)
+
+
+def _build_team_lookup():
+    lookup = {}
+    for abbreviation, city, nickname in TEAMS:
+        for name in (abbreviation, nickname, u'%s %s' % (city, nickname)):
+            lookup[name.lower()] = abbreviation
+    lookup.update(TEAM_ALIASES)
+    return lookup
+
+
+_TEAM_LOOKUP = _build_team_lookup()
+
+
+def get_team_abbreviation(team, season_id=None):
+    """The abbreviation for `team`, given as an abbreviation (any case), a
+    nickname (`Jets`) or a full name (`New York Jets`) - `None` if unknown
+
+    Without `season_id` a franchise always gets the same abbreviation (see
+    `TEAMS`); with it, the one ESPN used that season (`LAC` for the
+    Chargers from 2017 on).
+    """
+    if not team:
+        return None
+    abbreviation = _TEAM_LOOKUP.get(u' '.join(to_text(team).split()).lower())
+    try:
+        season = int(season_id)
+    except (TypeError, ValueError):
+        return abbreviation
+    for first_season, renamed in TEAM_RENAMES.get(abbreviation, ()):
+        if season >= first_season:
+            abbreviation = renamed
+    return abbreviation
+
+
+def normalize_name(name):
+    """`name` in a form that matches across sources: ASCII, lowercase,
+    without `*` markers, punctuation or a trailing `Jr.`/`III`
+    """
+    name = unidecode(to_text(name)).lower()
+    name = NAME_JUNK_REGEX.sub(u'', name).replace(u'-', u' ')
+    name = u' '.join(name.split())
+    return NAME_SUFFIX_REGEX.sub(u'', name)
+
+
+class DepthChartIndex(object):
+    """Depth chart rows (`(team, name, position, depth)`, as Rotoworld has
+    them) hashed on `(team abbreviation, normalized name, ESPN position)`
+
+    A player listed at several spots for one ESPN position (`RB` and `GLB`,
+    say) keeps the first one, which is where Rotoworld lists starters.
+    """
+
+    def __init__(self, rows):
+        self.index = {}
+        num_skipped = 0
+        for team, name, position, depth in rows:
+            abbreviation = get_team_abbreviation(team)
+            if abbreviation is None:
+                num_skipped += 1
+                continue
+            position = to_text(position)
+            key = (abbreviation,
+                   normalize_name(name),
+                   DEPTH_CHART_POSITIONS.get(position, position))
+            if key not in self.index:
+                self.index[key] = (position, int(depth))
+        if num_skipped:
+            logger.warning("Skipped %s depth chart rows with unknown teams",
+                           num_skipped)
+
+    @classmethod
+    def from_csv(cls, filename):
+        with open(filename, 'r') as fp:
+            reader = csv.reader(fp)
+            next(reader)
+            return cls(reader)
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, name, team, pos):
+        """`(depth chart position, depth)` for an ESPN player, or `None`
+        """
+        abbreviation = get_team_abbreviation(team)
+        if abbreviation is None or not name or not pos:
+            return None
+        return self.index.get((abbreviation,
+                               normalize_name(name),
+                               to_text(pos)))
+
+    def join(self, header_row, rows):
+        """`(header_row, rows)` with `DEPTH_CHART_COLUMNS` added to each row
+        (`None`s for players not on the depth chart); `rows` are lists in
+        `header_row` order and are consumed lazily
+        """
+        name_index = header_row.index('name')
+        team_index = header_row.index('team')
+        pos_index = header_row.index('pos')
+        no_match = (None,) * len(DEPTH_CHART_COLUMNS)
+
+        def joined_rows():
+            for row in rows:
+                match = self.get(row[name_index],
+                                 row[team_index],
+                                 row[pos_index])
+                yield list(row) + list(match or no_match)
+        return list(header_row) + list(DEPTH_CHART_COLUMNS), joined_rows()
+
+
+def join_csv(players_filename, depth_charts_filename, output_filename):
+    """Writes `players_filename` (an exported snapshot) to `output_filename`
+    with the depth chart columns added
+    """
+    index = DepthChartIndex.from_csv(depth_charts_filename)
+    num_rows = num_matched = 0
+    with open(players_filename, 'r') as fp_in:
+        reader = csv.reader(fp_in)
+        header_row, rows = index.join(next(reader), reader)
+        with open(output_filename, 'w') as fp_out:
+            writer = csv.writer(fp_out)
+            writer.writerow(header_row)
+            for row in rows:
+                num_rows += 1
+                if row[-1] is not None:
+                    num_matched += 1
+                writer.writerow(row)
+    logger.info("Found %s of %s players on the depth chart",
+                num_matched, num_rows)
+    return num_matched
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add Rotoworld depth chart ranks to an ESPN snapshot")
+    parser.add_argument('players', help="Exported players CSV")
+    parser.add_argument('depth_charts', help="Rotoworld depth charts CSV")
+    parser.add_argument('output')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    join_csv(args.players, args.depth_charts, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Per-stage timers and counters for scrape runs
+
+    metrics = Metrics()
+    team = ESPNTeam(league_id, team_id, season_id, metrics=metrics)
+    ...
+    metrics.write_json('run.json')
+    write_prometheus('fantasyfootball.prom', [({'league': '123'}, metrics)])
+
+Timers add up the seconds spent in a stage and how many times it ran. With
+concurrent fetching, stages running in parallel threads are summed, so they
+can add up to more than the wall time.
+
+`NULL_METRICS` (what `ESPNTeam` uses by default) has the same interface but
+records nothing, so leaving instrumentation off costs next to nothing.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+
+PROMETHEUS_PREFIX = 'fantasyfootball_'
+
+
+class _Timer(object):
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.metrics.add_time(self.name, time.time() - self.start)
+
+
+class Metrics(object):
+
+    enabled = True
+
+    def __init__(self):
+        self.counters = collections.defaultdict(int)
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            self.seconds[name] += seconds
+            self.calls[name] += 1
+
+    def timer(self, name):
+        """Context manager timing one run of stage `name`
+        """
+        return _Timer(self, name)
+
+    def summary(self):
+        with self.lock:
+            return {
+                'started_at': self.started_at,
+                'seconds': time.time() - self.started_at,
+                'counters': dict(self.counters),
+                'stages': dict((name, {'seconds': self.seconds[name],
+                                       'calls': self.calls[name]})
+                               for name in self.seconds),
+            }
+
+    def write_json(self, filename):
+        with open(filename, 'w') as fp:
+            json.dump(self.summary(), fp, indent=2, sort_keys=True)
+
+
+class _NullTimer(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class NullMetrics(object):
+
+    enabled = False
+
+    _timer = _NullTimer()
+
+    def count(self, name, value=1):
+        pass
+
+    def add_time(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        return self._timer
+
+    def summary(self):
+        return {}
+
+
+NULL_METRICS = NullMetrics()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('"', '\\"'))
+                             for key, value in sorted(labels.items()))
+
+
+def format_prometheus(runs, prefix=PROMETHEUS_PREFIX):
+    """Prometheus text format for `runs`, a list of `(labels, metrics)`
+    pairs - e.g. one per league
+    """
+    samples = collections.defaultdict(list)
+    for labels, metrics in runs:
+        summary = metrics.summary()
+        if not summary:
+            continue
+        for name, value in sorted(summary['counters'].items()):
+            samples[('%s%s_total' % (prefix, name), 'counter')].append(
+                (labels, value))
+        for name, stage in sorted(summary['stages'].items()):
+            stage_labels = dict(labels, stage=name)
+            samples[('%sstage_seconds_total' % prefix, 'counter')].append(
+                (stage_labels, stage['seconds']))
+            samples[('%sstage_calls_total' % prefix, 'counter')].append(
+                (stage_labels, stage['calls']))
+        samples[('%srun_seconds' % prefix, 'gauge')].append(
+            (labels, summary['seconds']))
+    lines = []
+    for (name, metric_type), values in sorted(samples.items()):
+        lines.append('# TYPE %s %s' % (name, metric_type))
+        for labels, value in values:
+            lines.append('%s%s %s' % (name, _format_labels(labels), value))
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(filename, runs, prefix=PROMETHEUS_PREFIX):
+    """Writes `format_prometheus()` to `filename` atomically, as the node
+    exporter's textfile collector expects
+    """
+    partial_filename = '%s.part' % filename
+    with open(partial_filename, 'w') as fp:
+        fp.write(format_prometheus(runs, prefix))
+    os.rename(partial_filename, filename)
@@ -0,0 +1,173 @@
+"""HTML parsing backends for the ESPN scraper
+
+Each backend knows how to turn a page into a BeautifulSoup-ish document
+(`soup()`) and how to pull out just the player rows (`player_rows()`). A
+player row is a list of cells, each with a `.text` attribute, which is all
+`ESPNTeam._parse_player_info_advanced()` and friends need.
+"""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.etree
+import lxml.html
+
+
+PARSER_HTML5LIB = 'html5lib'
+PARSER_LXML = 'lxml'
+PARSER_LXML_XPATH = 'lxml-xpath'
+PARSER_LXML_STREAM = 'lxml-stream'
+
+# html5lib can't do partial parsing, see `SoupParser.player_rows()`
+BUILDERS_WITHOUT_PARSE_ONLY = (PARSER_HTML5LIB,)
+
+PLAYER_ROW_CLASS = 'pncPlayerRow'
+
+
+TEXT_TYPE = type(u'')
+
+
+class InvalidParserError(Exception):
+    pass
+
+
+class Cell(object):
+    """Stand-in for a bs4 `<td>` Tag, for backends that skip BeautifulSoup
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        # lxml hands back byte strings for plain ASCII under Python 2
+        self.text = TEXT_TYPE(text)
+
+    def __repr__(self):
+        return '<td>%s</td>' % self.text
+
+
+class SoupParser(object):
+    """BeautifulSoup tree, using the given tree builder
+
+    For player rows, builders that support it only materialize the
+    `tr.pncPlayerRow` elements (via a `SoupStrainer`) - nav, scripts, ads
+    etc. never make it into the tree.
+    """
+    # The strainer sees the raw `class` attribute string, not the split list
+    PLAYER_ROWS_STRAINER = SoupStrainer(
+        'tr', class_=re.compile(r'(^|\s)%s(\s|$)' % PLAYER_ROW_CLASS))
+
+    def __init__(self, builder):
+        self.name = builder
+        self.builder = builder
+
+    def soup(self, content, parse_only=None):
+        return BeautifulSoup(content, self.builder, parse_only=parse_only)
+
+    def player_rows(self, content):
+        if self.builder in BUILDERS_WITHOUT_PARSE_ONLY:
+            soup = self.soup(content)
+        else:
+            soup = self.soup(content, parse_only=self.PLAYER_ROWS_STRAINER)
+        return [player_row.find_all('td')
+                for player_row in soup.find_all('tr', PLAYER_ROW_CLASS)]
+
+
+class XPathParser(object):
+    """lxml.etree + XPath fast path, no BeautifulSoup involved for player rows
+
+    `soup()` still hands back a BeautifulSoup document (built by lxml) for
+    the pages that aren't player tables.
+    """
+    name = PARSER_LXML_XPATH
+    XPATH_PLAYER_ROWS = lxml.etree.XPath(
+        "//tr[contains(concat(' ', normalize-space(@class), ' '), ' pncPlayerRow ')]")
+    # Plain strings, so the cells don't keep the whole tree alive
+    XPATH_TEXT = lxml.etree.XPath('string()', smart_strings=False)
+
+    def soup(self, content):
+        return BeautifulSoup(content, PARSER_LXML)
+
+    def player_rows(self, content):
+        try:
+            document = lxml.html.document_fromstring(content)
+        except lxml.etree.ParserError:
+            # An empty (or whitespace-only) page, which the other backends
+            # read as having no rows
+            return []
+        return [[Cell(self.XPATH_TEXT(col)) for col in player_row.iter('td')]
+                for player_row in self.XPATH_PLAYER_ROWS(document)]
+
+
+class PlayerRowsTarget(object):
+    """lxml parser target that keeps nothing but the text of the cells in
+    `tr.pncPlayerRow` rows - no tree gets built at all
+    """
+
+    def __init__(self):
+        self.player_rows = []
+        self._player_cols = None
+        self._open_cols = []
+        self._row_depth = 0
+
+    def start(self, tag, attrib):
+        if self._player_cols is None:
+            if tag == 'tr' and \
+                    PLAYER_ROW_CLASS in attrib.get('class', '').split():
+                self._player_cols = []
+                self._row_depth = 1
+            return
+        if tag == 'tr':
+            self._row_depth += 1
+        elif tag == 'td':
+            col = []
+            self._player_cols.append(col)
+            self._open_cols.append(col)
+
+    def end(self, tag):
+        if self._player_cols is None:
+            return
+        if tag == 'td':
+            if self._open_cols:
+                self._open_cols.pop()
+        elif tag == 'tr':
+            self._row_depth -= 1
+            if not self._row_depth:
+                self.player_rows.append([Cell(u''.join(col))
+                                         for col in self._player_cols])
+                self._player_cols = None
+                self._open_cols = []
+
+    def data(self, data):
+        # Nested cells count towards their parents' text too, like `.text`
+        for col in self._open_cols:
+            col.append(data)
+
+    def close(self):
+        return self.player_rows
+
+
+class StreamParser(XPathParser):
+    """Streams the page through lxml's parser, only materializing the
+    player rows' cell text
+    """
+    name = PARSER_LXML_STREAM
+
+    def player_rows(self, content):
+        parser = lxml.etree.HTMLParser(target=PlayerRowsTarget())
+        parser.feed(content)
+        return parser.close()
+
+
+PARSERS = {
+    PARSER_HTML5LIB: lambda: SoupParser(PARSER_HTML5LIB),
+    PARSER_LXML: lambda: SoupParser(PARSER_LXML),
+    PARSER_LXML_XPATH: XPathParser,
+    PARSER_LXML_STREAM: StreamParser,
+}
+
+
+def get_parser(name):
+    try:
+        return PARSERS[name]()
+    except KeyError:
+        raise InvalidParserError("Unknown parser `%s` (expected one of: %s)"
+                                 % (name, ', '.join(sorted(PARSERS))))
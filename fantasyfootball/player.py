@@ -0,0 +1,161 @@
+"""Compact player record, used instead of a dict per player
+"""
+
+import logging
+import re
+
+# Also the CSV column order
+PLAYER_KEYS = (
+    'name',
+    'team',
+    'pos',
+    'status',
+    'owner',
+    'opp',
+    'home_away',
+    'status_et',
+    'prk',
+    'pts',
+    'avg',
+    'last',
+    'proj',
+    'oprk',
+    'pct_st',
+    'pct_own',
+    'plus_minus',
+)
+
+# ESPN's placeholder for "no value"
+MISSING_VALUES = frozenset(['', '--'])
+
+# OPRK is shown as an ordinal (`28th`)
+ORDINAL_SUFFIX_REGEX = re.compile(r'(?<=\d)(st|nd|rd|th)$')
+
+logger = logging.getLogger(__name__)
+
+
+def _converter(cast):
+    def convert(value):
+        if value is None:
+            return None
+        value = value.strip()
+        if value in MISSING_VALUES:
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            logger.debug("Unable to convert %r with %s", value, cast)
+            return None
+    return convert
+
+
+def _ordinal_to_int(value):
+    return int(ORDINAL_SUFFIX_REGEX.sub('', value))
+
+
+to_int = _converter(int)
+to_ordinal = _converter(_ordinal_to_int)
+to_float = _converter(float)
+
+
+def to_text(value):
+    # Python 2 CSV values are UTF-8 byte strings
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+# Every numeric stat column and how to convert it, see `coerce_numeric()`
+NUMERIC_CONVERTERS = (
+    ('prk', to_int),
+    ('pts', to_float),
+    ('avg', to_float),
+    ('last', to_float),
+    ('proj', to_float),
+    ('oprk', to_ordinal),
+    ('pct_st', to_float),
+    ('pct_own', to_float),
+    ('plus_minus', to_float),
+)
+
+
+def coerce_numeric(player):
+    """Converts the numeric stat columns of a `Player` (or a `get_team()`
+    dict) from strings to int/float, in place - `'--'` becomes `None`
+    """
+    for key, convert in NUMERIC_CONVERTERS:
+        player[key] = convert(player[key])
+    return player
+
+
+class Player(object):
+    """One row of the free-agency table
+
+    Fields are fixed (see `PLAYER_KEYS`) and default to `None`. Supports the
+    bits of the dict interface existing callers use (`player['name']`,
+    `.get()`, `.keys()`, assigning to known fields) so they keep working.
+    """
+    __slots__ = PLAYER_KEYS
+
+    def __init__(self, **fields):
+        for key in PLAYER_KEYS:
+            setattr(self, key, fields.pop(key, None))
+        if fields:
+            raise TypeError("Unknown Player field(s): %s" %
+                            ', '.join(sorted(fields)))
+
+    @classmethod
+    def from_dicts(cls, *dicts):
+        player = cls()
+        for fields in dicts:
+            for key, value in fields.items():
+                setattr(player, key, value)
+        return player
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in PLAYER_KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return list(PLAYER_KEYS)
+
+    def to_row(self):
+        return [getattr(self, key) for key in PLAYER_KEYS]
+
+    def to_dict(self):
+        return dict(zip(PLAYER_KEYS, self.to_row()))
+
+    # `__slots__` classes can't be pickled by default under Python 2
+    def __getstate__(self):
+        return self.to_row()
+
+    def __setstate__(self, state):
+        for key, value in zip(PLAYER_KEYS, state):
+            setattr(self, key, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Player):
+            return NotImplemented
+        return self.to_row() == other.to_row()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Player(%s)' % ', '.join('%s=%r' % (key, getattr(self, key))
+                                        for key in PLAYER_KEYS)
@@ -0,0 +1,185 @@
+"""Rate limiting and retries for the scraper
+
+`RateLimiter` is a token bucket shared by every request of one or more
+`ESPNTeam`s:
+
+- requests are spaced out to `rate` per second (with bursts of up to
+  `burst`), and at most `max_concurrency` are in flight at once
+- throttling responses (429/503) halve the current rate, and a `Retry-After`
+  header (capped at `MAX_RETRY_AFTER`) pauses every request until it has
+  passed; each successful response then creeps the rate back up towards
+  `rate`
+- throttling and 5xx responses are retried with exponential backoff, and
+  once `max_retries` is used up a `FetchError` is raised - a page is never
+  silently dropped
+
+`reserve()` / `on_response()` don't sleep themselves, so the same limiter
+works for `fantasyfootball.espn_async` too.
+"""
+
+import contextlib
+import email.utils
+import logging
+import threading
+import time
+
+
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 5
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_FACTOR = 1.0
+MAX_BACKOFF = 60.0
+# Longest `Retry-After` honored, so a bogus one (or a far-off date) can't
+# stall an export for hours
+MAX_RETRY_AFTER = 300.0
+
+# Adaptive rate: multiplied by this when throttled, and growing back by this
+# share of the configured rate per successful response
+DECREASE_FACTOR = 0.5
+INCREASE_SHARE = 0.05
+MIN_RATE = 0.1
+
+THROTTLE_STATUSES = (429, 503)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+
+    def __init__(self, url, status_code):
+        super(FetchError, self).__init__("Got HTTP %s for %s" % (status_code,
+                                                                url))
+        self.url = url
+        self.status_code = status_code
+
+
+def raise_for_status(url, response):
+    if response.status_code >= 400:
+        raise FetchError(url, response.status_code)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a `Retry-After` header - either a number of
+    seconds or an HTTP date
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+class RateLimiter(object):
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 max_concurrency=None, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR):
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.tokens = float(burst)
+        self.updated_at = time.time()
+        self.paused_until = 0
+        self.throttled = 0
+        self.retries = 0
+        self.lock = threading.Lock()
+        self.semaphore = None
+        if max_concurrency:
+            self.semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def reserve(self):
+        """Takes a token, returning how many seconds to wait before making
+        the request
+        """
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated_at) *
+                              self.rate)
+            self.updated_at = now
+            # Tokens can go negative: later callers queue up behind
+            self.tokens -= 1
+            delay = 0
+            if self.tokens < 0:
+                delay = -self.tokens / self.rate
+            return max(delay, self.paused_until - now)
+
+    def on_response(self, url, status_code, retry_after=None, attempt=0):
+        """Adapts the rate to a response's `status_code` (and `Retry-After`
+        header value), returning `None` if it's final or how many seconds to
+        wait before retrying
+
+        Raises `FetchError` once `max_retries` retries are used up.
+        """
+        retry_after = parse_retry_after(retry_after)
+        if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+            logger.warning("Retry-After of %.0fs for %s, waiting %.0fs "
+                           "instead", retry_after, url, MAX_RETRY_AFTER)
+            retry_after = MAX_RETRY_AFTER
+        with self.lock:
+            if status_code in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+                if retry_after:
+                    self.paused_until = max(self.paused_until,
+                                            time.time() + retry_after)
+                logger.warning("Throttled (HTTP %s), down to %.2f "
+                               "requests/s", status_code, self.rate)
+            elif status_code < 500:
+                self.rate = min(self.max_rate,
+                                self.rate + self.max_rate * INCREASE_SHARE)
+            if status_code not in RETRY_STATUSES:
+                return None
+            if attempt >= self.max_retries:
+                raise FetchError(url, status_code)
+            self.retries += 1
+        if retry_after is not None:
+            return retry_after
+        return min(MAX_BACKOFF, self.backoff_factor * 2 ** attempt)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Holds one of the `max_concurrency` request slots
+        """
+        if self.semaphore is None:
+            yield
+            return
+        with self.semaphore:
+            yield
+
+    def get(self, session, url, **kwargs):
+        """`session.get()`, rate limited and retried
+        """
+        attempt = 0
+        while True:
+            delay = self.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            with self.slot():
+                response = session.get(url, **kwargs)
+            delay = self.on_response(url,
+                                     response.status_code,
+                                     response.headers.get('Retry-After'),
+                                     attempt)
+            if delay is None:
+                return response
+            logger.warning("HTTP %s for %s, retrying in %.1fs",
+                           response.status_code, url, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'throttled': self.throttled,
+            'retries': self.retries,
+        }
@@ -0,0 +1,261 @@
+"""Embedded (SQLite) time-series store of player snapshots
+
+Tables:
+
+- `snapshots`: one row per export, keyed by `taken_at`
+- `players`: one row per `(name, team, pos)` (`*` stripped from names, like
+  `fantasyfootball.columnar`)
+- `stats`: one row per player per snapshot, holding every other column;
+  numeric columns are stored as numbers (`NULL` for `--`)
+
+`stats` is keyed on `(player_id, taken_at)`, so `history()` is an index range
+scan, and also indexed on `snapshot_id`, so `top_movers()` only reads the
+two snapshots it compares - both stay fast however many snapshots pile up.
+"""
+
+import csv
+import datetime
+import logging
+import re
+import sqlite3
+
+from fantasyfootball.player import NUMERIC_CONVERTERS, PLAYER_KEYS, to_text
+
+
+KEY_COLUMNS = ('name', 'team', 'pos')
+STAT_COLUMNS = tuple(key for key in PLAYER_KEYS if key not in KEY_COLUMNS)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# `players-2016-09-12-17-24.csv` and `players-2017-09-07-thu-23-56.csv`
+FILENAME_TIME_REGEX = re.compile(
+    r'players-(\d{4}-\d{2}-\d{2})-(?:[a-z]{3}-)?(\d{2})-(\d{2})')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    team TEXT NOT NULL,
+    pos TEXT NOT NULL,
+    UNIQUE (name, team, pos)
+);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+CREATE TABLE IF NOT EXISTS stats (
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    taken_at TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    %s,
+    PRIMARY KEY (player_id, taken_at)
+);
+CREATE INDEX IF NOT EXISTS stats_snapshot ON stats (snapshot_id, player_id);
+""" % ',\n    '.join('%s %s' % (column, column in dict(NUMERIC_CONVERTERS)
+                                and 'NUMERIC' or 'TEXT')
+                     for column in STAT_COLUMNS)
+
+_CONVERTERS = dict(NUMERIC_CONVERTERS)
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidColumnError(Exception):
+    pass
+
+
+def format_time(value):
+    """`taken_at` as stored: `datetime`s are formatted, strings are assumed
+    to already be in `TIME_FORMAT` (or a prefix of it, like a date)
+    """
+    if isinstance(value, datetime.datetime):
+        return value.strftime(TIME_FORMAT)
+    if isinstance(value, datetime.date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def get_snapshot_time(filename):
+    """`datetime` an exported CSV was taken at, from its filename
+    """
+    match = FILENAME_TIME_REGEX.search(filename)
+    if not match:
+        return None
+    date, hour, minute = match.groups()
+    return datetime.datetime.strptime('%s %s:%s' % (date, hour, minute),
+                                      '%Y-%m-%d %H:%M')
+
+
+def _to_value(column, value):
+    value = to_text(value)
+    convert = _CONVERTERS.get(column)
+    if convert is None or value is None or \
+            isinstance(value, (int, float)):
+        return value
+    return convert(value)
+
+
+def _check_column(column, numeric=False):
+    if column not in STAT_COLUMNS:
+        raise InvalidColumnError("Unknown column `%s`" % column)
+    if numeric and column not in _CONVERTERS:
+        raise InvalidColumnError("Column `%s` isn't numeric" % column)
+
+
+class PlayerStore(object):
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_player_ids(self, keys):
+        cursor = self.connection.cursor()
+        cursor.executemany("INSERT OR IGNORE INTO players (name, team, pos) "
+                           "VALUES (?, ?, ?)",
+                           keys)
+        return dict(((name, team, pos), player_id)
+                    for player_id, name, team, pos in
+                    cursor.execute("SELECT id, name, team, pos FROM players"))
+
+    def add_snapshot(self, taken_at, header_row, rows):
+        """Stores `rows` (lists in `header_row` order, as written to the
+        CSVs) as the snapshot taken at `taken_at`, replacing any snapshot
+        already stored for that time
+        """
+        taken_at = format_time(taken_at)
+        indexes = dict((column, i) for i, column in enumerate(header_row))
+        records = []
+        for row in rows:
+            key = (to_text(row[indexes['name']]).replace(u'*', u''),
+                   to_text(row[indexes['team']]) or u'',
+                   to_text(row[indexes['pos']]) or u'')
+            values = [_to_value(column, row[indexes[column]])
+                      if column in indexes else None
+                      for column in STAT_COLUMNS]
+            records.append((key, values))
+        with self.connection:
+            cursor = self.connection.cursor()
+            cursor.execute("DELETE FROM stats WHERE taken_at = ?",
+                           (taken_at,))
+            cursor.execute("INSERT OR REPLACE INTO snapshots (taken_at) "
+                           "VALUES (?)",
+                           (taken_at,))
+            snapshot_id = cursor.lastrowid
+            player_ids = self._get_player_ids(set(key for key, _ in records))
+            query = "INSERT OR REPLACE INTO stats " \
+                    "(player_id, taken_at, snapshot_id, %s) VALUES (%s)" % (
+                        ', '.join(STAT_COLUMNS),
+                        ', '.join('?' * (len(STAT_COLUMNS) + 3)))
+            cursor.executemany(query,
+                               ([player_ids[key], taken_at, snapshot_id] +
+                                values
+                                for key, values in records))
+        logger.info("Stored %s players taken at %s", len(records), taken_at)
+        return snapshot_id
+
+    def add_csv(self, filename, taken_at=None):
+        """Backfills an exported CSV, taken at `taken_at` (default: the time
+        in its filename)
+        """
+        if taken_at is None:
+            taken_at = get_snapshot_time(filename)
+            if taken_at is None:
+                raise ValueError("No time in filename `%s`" % filename)
+        with open(filename, 'r') as fp:
+            reader = csv.reader(fp)
+            header_row = next(reader, None)
+            if header_row is None:
+                return None
+            return self.add_snapshot(taken_at, header_row, reader)
+
+    def get_snapshot_times(self):
+        return [taken_at for taken_at, in self.connection.execute(
+            "SELECT taken_at FROM snapshots ORDER BY taken_at")]
+
+    def history(self, player, column, start=None, end=None, team=None,
+                pos=None):
+        """`[(taken_at, team, pos, value)]` of `column` for `player` (a name,
+        `*` optional), oldest first, optionally limited to `start <= taken_at
+        <= end`
+
+        Players sharing a name (there are two Mike Williams) are told apart
+        by `team` and `pos`; leave `team` off to follow a player that
+        switched teams.
+        """
+        _check_column(column)
+        query = "SELECT stats.taken_at, players.team, players.pos, " \
+                "stats.%s FROM players " \
+                "JOIN stats ON stats.player_id = players.id " \
+                "WHERE players.name = ?" % column
+        params = [to_text(player).replace(u'*', u'')]
+        if team is not None:
+            query += " AND players.team = ?"
+            params.append(to_text(team))
+        if pos is not None:
+            query += " AND players.pos = ?"
+            params.append(to_text(pos))
+        if start is not None:
+            query += " AND stats.taken_at >= ?"
+            params.append(format_time(start))
+        if end is not None:
+            query += " AND stats.taken_at <= ?"
+            params.append(format_time(end))
+        query += " ORDER BY stats.taken_at"
+        return self.connection.execute(query, params).fetchall()
+
+    def _get_snapshot(self, taken_at, before=True):
+        if before:
+            query = "SELECT id, taken_at FROM snapshots WHERE taken_at <= ? " \
+                    "ORDER BY taken_at DESC LIMIT 1"
+        else:
+            query = "SELECT id, taken_at FROM snapshots WHERE taken_at >= ? " \
+                    "ORDER BY taken_at LIMIT 1"
+        return self.connection.execute(query, (taken_at,)).fetchone()
+
+    def top_movers(self, column, window, end=None, limit=10):
+        """Players whose `column` changed the most (either way) over the
+        `window` (a `timedelta`) up to `end` (default: the latest snapshot)
+
+        Compares the latest snapshot at or before `end` with the earliest one
+        inside the window. Returns `[(name, team, pos, old, new, change)]`,
+        biggest absolute change first.
+        """
+        _check_column(column, numeric=True)
+        if end is None:
+            row = self.connection.execute(
+                "SELECT MAX(taken_at) FROM snapshots").fetchone()
+            end = row[0]
+            if end is None:
+                return []
+        elif isinstance(end, datetime.datetime):
+            end = format_time(end)
+        last = self._get_snapshot(end)
+        if last is None:
+            return []
+        last_time = datetime.datetime.strptime(last[1], TIME_FORMAT)
+        first = self._get_snapshot(format_time(last_time - window),
+                                   before=False)
+        if first is None or first[0] == last[0]:
+            return []
+        query = "SELECT players.name, players.team, players.pos, " \
+                "old.{0}, new.{0}, new.{0} - old.{0} AS change " \
+                "FROM stats AS new " \
+                "JOIN stats AS old ON old.player_id = new.player_id " \
+                "AND old.snapshot_id = ? " \
+                "JOIN players ON players.id = new.player_id " \
+                "WHERE new.snapshot_id = ? AND change IS NOT NULL " \
+                "ORDER BY ABS(change) DESC, players.name " \
+                "LIMIT ?".format(column)
+        return self.connection.execute(query,
+                                       (first[0], last[0], limit)).fetchall()
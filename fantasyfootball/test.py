@@ -1,18 +1,528 @@
+"""Offline tests: the scraper against replayed fixtures (synthetic ones by
+default, see `fantasyfootball.fixtures`)
 
+Run from the repo root:
+
+    python -m unittest fantasyfootball.test
+"""
+
+import csv
+import datetime
+import email.utils
+import os
+import shutil
+import tempfile
+import time
 import unittest
 
-from espn import ESPNFantasyFootballTeam
-import settings
+from fantasyfootball import columnar
+from fantasyfootball import delta
+from fantasyfootball.cache import ResponseCache
+from fantasyfootball.espn import ESPNTeam
+from fantasyfootball.fixtures import get_fixture_key, ReplayServer
+from fantasyfootball.identity import DepthChartIndex, get_team_abbreviation
+from fantasyfootball.metrics import format_prometheus, Metrics, NULL_METRICS
+from fantasyfootball.parsers import get_parser, PARSERS
+from fantasyfootball import ratelimit
+from fantasyfootball.ratelimit import FetchError, RateLimiter
+from fantasyfootball.store import PlayerStore
+
+from benchmarks import synthetic
+
+try:
+    import asyncio
+    import httpx
+except ImportError:
+    # Python 2, or no httpx
+    httpx = None
+else:
+    from fantasyfootball.espn_async import AsyncESPNTeam
+
+
+NUM_PLAYERS = 120
+NUM_TEAMS = 12
+
+
+class TestESPN(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        fixtures = synthetic.get_fixtures(NUM_PLAYERS, NUM_TEAMS)
+        cls.server = ReplayServer(fixtures).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def get_team(self, league_id=synthetic.LEAGUE_ID, **kwargs):
+        team = ESPNTeam(league_id, synthetic.TEAM_ID, synthetic.SEASON_ID,
+                        **kwargs)
+        team.set_cookie('')
+        team.session.proxies = {'http': self.server.url}
+        return team
+
+    def get_cache(self, **kwargs):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return ResponseCache(directory, **kwargs)
+
+    def test_players(self):
+        players = self.get_team().get_players()
+        self.assertEqual(len(players), NUM_PLAYERS)
+        player = players[1]
+        self.assertEqual(player['name'], 'Player1 Lastname1')
+        self.assertEqual(player['team'], 'Buf')
+        self.assertEqual(player['pos'], 'RB')
+        self.assertEqual(player['opp'], 'NE')
+        self.assertEqual(player['home_away'], 'AWAY')
+        self.assertEqual(players[5]['name'], 'Jets D/ST')
+        self.assertEqual(players[5]['team'], 'NYJ')
+
+    def test_players_concurrent(self):
+        self.assertEqual(self.get_team().get_players(concurrency=4),
+                         self.get_team().get_players())
+
+    def test_parsers_agree(self):
+        expected = self.get_team().get_players()
+        for parser in PARSERS:
+            self.assertEqual(self.get_team(parser=parser).get_players(),
+                             expected,
+                             parser)
+            # An empty page ends pagination rather than the pull
+            for content in (b'', b' \n '):
+                self.assertEqual(get_parser(parser).player_rows(content), [],
+                                 parser)
+
+    def test_typed(self):
+        players = self.get_team(typed=True).get_players()
+        player = players[3]
+        self.assertEqual(player['prk'], 3)
+        self.assertEqual(player['pts'], 9.0)
+        # Shown as `4th`, `28th`
+        self.assertEqual(player['oprk'], 4)
+        self.assertEqual(players[27]['oprk'], 28)
+        self.assertEqual(self.get_team().get_players()[27]['oprk'], '28th')
+
+    def test_team(self):
+        players = self.get_team().get_team()
+        self.assertEqual(len(players), len(synthetic.SLOTS))
+        self.assertEqual(players[0]['slot'], 'QB')
+        self.assertEqual(players[0]['name'], 'Player0 Lastname0')
+
+    def test_snapshot(self):
+        team = self.get_team()
+        num_requests = self.server.num_requests
+        snapshot = team.snapshot()
+        # The clubhouse + every free-agency page, including the empty last one
+        self.assertEqual(self.server.num_requests - num_requests,
+                         1 + len(range(0, NUM_PLAYERS + 50, 50)))
+        self.assertEqual(snapshot.players, self.get_team().get_players())
+        self.assertEqual([slot for slot, _ in snapshot.team], synthetic.SLOTS)
+        slot, player = snapshot.team[1]
+        self.assertEqual(player['name'], 'Player1 Lastname1')
+        self.assertNotIn('FA', snapshot.rosters)
+        self.assertNotIn('WA (Wed)', snapshot.rosters)
+        # A real team whose name starts like the waivers marker
+        self.assertEqual(len(snapshot.rosters['WALT']),
+                         len(range(1, NUM_PLAYERS, 12)))
+        self.assertEqual(sum(len(roster) for roster in snapshot.rosters.values()),
+                         len([player for player in snapshot.players
+                              if player['owner'] not in ('FA', 'WA (Wed)')]))
+
+    def test_scoreboard(self):
+        matchups = self.get_team().get_scoreboard()
+        self.assertEqual(len(matchups), NUM_TEAMS // 2)
+        team1, team2 = matchups[0]
+        self.assertEqual(team1['name'], 'Team 1')
+        self.assertEqual(team2['owner'], 'Owner 2')
+        self.assertEqual(team1['data']['Top Scorer'], 'Player1 Lastname1')
+
+    def test_watch_scoreboard(self):
+        team = self.get_team(league_id='watch')
+        key = get_fixture_key(team._get_scoreboard_url())
+        content = synthetic.scoreboard_page(NUM_TEAMS)
+        self.server.fixtures[key] = content
+        polls = team.watch_scoreboard(interval=0, max_polls=3)
+        self.assertEqual(len(next(polls)), NUM_TEAMS)
+        self.server.fixtures[key] = content.replace(b'>67.3<', b'>70.3<')
+        changes = next(polls)
+        self.assertEqual(changes, [{'matchup': 0,
+                                    'name': 'Team 1',
+                                    'changes': {'score': '70.3'}}])
+        # Third poll: nothing changed, nothing yielded
+        self.assertEqual(list(polls), [])
+
+    def test_cache_fresh(self):
+        cache = self.get_cache(ttl=60)
+        team = self.get_team(cache=cache)
+        num_requests = self.server.num_requests
+        self.assertEqual(team.get_team(), team.get_team())
+        self.assertEqual(self.server.num_requests - num_requests, 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_cache_revalidation(self):
+        cache = self.get_cache(ttl=0)
+        team = self.get_team(cache=cache)
+        self.assertEqual(team.get_team(), team.get_team())
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['revalidations'], 1)
+
+    def test_cache_eviction(self):
+        team_page = synthetic.team_page()
+        # Room for the clubhouse page, but not for the scoreboard as well
+        cache = self.get_cache(ttl=60, max_size=len(team_page) + 1)
+        team = self.get_team(cache=cache)
+        team.get_team()
+        team.get_scoreboard()
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(len([name for name in os.listdir(cache.directory)
+                              if name.endswith('.body')]), 1)
+        # The least recently used entry (the clubhouse page) went
+        team.get_team()
+        self.assertEqual(cache.stats()['misses'], 3)
+
+    def test_metrics(self):
+        metrics = Metrics()
+        self.get_team(metrics=metrics).get_players()
+        summary = metrics.summary()
+        # Every free-agency page, including the empty last one
+        num_pages = len(range(0, NUM_PLAYERS + 50, 50))
+        self.assertEqual(summary['counters']['pages_fetched'], num_pages)
+        self.assertEqual(summary['counters']['rows_found'], NUM_PLAYERS)
+        self.assertEqual(summary['counters']['players_parsed'], NUM_PLAYERS)
+        self.assertEqual(summary['stages']['fetch']['calls'], num_pages)
+        self.assertEqual(summary['stages']['parse_rows']['calls'], num_pages)
+        lines = format_prometheus([({'league': '1', 'name': 'The "A" Team'},
+                                    metrics),
+                                   ({'league': '2'}, NULL_METRICS)]).split('\n')
+        self.assertIn('# TYPE fantasyfootball_pages_fetched_total counter',
+                      lines)
+        self.assertIn('fantasyfootball_pages_fetched_total'
+                      '{league="1",name="The \\"A\\" Team"} %d' % num_pages,
+                      lines)
+        self.assertIn('fantasyfootball_stage_calls_total'
+                      '{league="1",name="The \\"A\\" Team",stage="fetch"} %d'
+                      % num_pages,
+                      lines)
+        self.assertIn('# TYPE fantasyfootball_run_seconds gauge', lines)
+        # Runs without metrics are left out
+        self.assertFalse([line for line in lines if 'league="2"' in line])
+
+    def test_missing_page(self):
+        with self.assertRaises(FetchError):
+            self.get_team(league_id='404').get_players()
+
+    def test_retries(self):
+        limiter = RateLimiter(max_retries=2, backoff_factor=0)
+        team = self.get_team(league_id='retries', rate_limiter=limiter)
+        key = get_fixture_key(team._get_team_url())
+        self.server.fixtures[key] = synthetic.team_page()
+        self.server.fail(key, 429, times=2, headers={'Retry-After': '0'})
+        self.assertEqual(len(team.get_team()), len(synthetic.SLOTS))
+        self.assertEqual(limiter.stats()['throttled'], 2)
+        self.assertEqual(limiter.stats()['retries'], 2)
+        # Out of retries
+        self.server.fail(key, 503, times=3)
+        with self.assertRaises(FetchError) as context:
+            team.get_team()
+        self.assertEqual(context.exception.status_code, 503)
+
+    def test_write_data(self):
+        try:
+            import export
+        except ImportError:
+            raise unittest.SkipTest("export.py needs a `settings` module")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'players-2016-09-12-17-24.csv')
+        export.write_data(filename, self.get_team())
+        self.assertEqual(os.listdir(directory), [os.path.basename(filename)])
+        with open(filename, 'r') as fp:
+            self.assertEqual(len(list(csv.reader(fp))), NUM_PLAYERS + 1)
+        # A failed export leaves neither the CSV nor its `.part` behind
+        os.remove(filename)
+        with self.assertRaises(FetchError):
+            export.write_data(filename, self.get_team(league_id='404'))
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_depth_chart_join(self):
+        index = DepthChartIndex([
+            ('Buffalo Bills', 'Player1 Lastname1', 'GLB', '2'),
+            ('Buffalo Bills', 'Player1 Lastname1', 'RB', '1'),
+            ('New York Jets', 'Player1 Lastname1', 'RB', '3'),
+        ])
+        players = self.get_team().get_players()
+        header_row = list(players[0].keys())
+        header_row, rows = index.join(
+            header_row, [player.to_row() for player in players])
+        rows = list(rows)
+        self.assertEqual(rows[1][-2:], ['GLB', 2])
+        self.assertEqual(rows[0][-2:], [None, None])
+
+    def test_team_abbreviation(self):
+        self.assertEqual(get_team_abbreviation('Chargers'), 'SD')
+        self.assertEqual(get_team_abbreviation('Chargers', '2016'), 'SD')
+        self.assertEqual(get_team_abbreviation('Chargers', '2017'), 'LAC')
+        self.assertEqual(get_team_abbreviation('Rams', 2017), 'LAR')
+        self.assertEqual(get_team_abbreviation('Raiders', 2020), 'LV')
+        self.assertEqual(get_team_abbreviation('Jets', 2017), 'NYJ')
+        # Whatever the season, a depth chart still matches
+        index = DepthChartIndex([
+            ('San Diego Chargers', 'Mike Williams', 'WR1', '2'),
+        ])
+        self.assertEqual(index.get('Mike Williams', 'LAC', 'WR'), ('WR1', 2))
+
+
+@unittest.skipIf(httpx is None, "AsyncESPNTeam needs Python 3 and httpx")
+class TestAsyncESPN(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        fixtures = synthetic.get_fixtures(NUM_PLAYERS, NUM_TEAMS)
+        cls.server = ReplayServer(fixtures).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def get_team(self, league_id=synthetic.LEAGUE_ID, **kwargs):
+        client = httpx.AsyncClient(proxy=self.server.url)
+        self.addCleanup(self.run_async, client.aclose())
+        team = AsyncESPNTeam(league_id, synthetic.TEAM_ID,
+                             synthetic.SEASON_ID, client=client, **kwargs)
+        team.set_cookie('')
+        return team
+
+    def get_sync_team(self):
+        team = ESPNTeam(synthetic.LEAGUE_ID, synthetic.TEAM_ID,
+                        synthetic.SEASON_ID)
+        team.set_cookie('')
+        team.session.proxies = {'http': self.server.url}
+        return team
+
+    def test_players(self):
+        expected = self.get_sync_team().get_players()
+        players = self.run_async(self.get_team().get_players())
+        self.assertEqual(len(players), NUM_PLAYERS)
+        self.assertEqual(players, expected)
+        players = self.run_async(self.get_team().get_players(concurrency=4))
+        self.assertEqual(players, expected)
+
+    def test_team(self):
+        self.assertEqual(self.run_async(self.get_team().get_team()),
+                         self.get_sync_team().get_team())
+        soup = self.run_async(self.get_team()._get_team_soup())
+        self.assertIsNotNone(soup)
+
+    def test_scoreboard(self):
+        matchups = self.run_async(self.get_team().get_scoreboard())
+        self.assertEqual(len(matchups), NUM_TEAMS // 2)
+        self.assertEqual(matchups, self.get_sync_team().get_scoreboard())
+
+    def test_watch_scoreboard(self):
+        team = self.get_team(league_id='watch-async')
+        key = get_fixture_key(team._get_scoreboard_url())
+        content = synthetic.scoreboard_page(NUM_TEAMS)
+        self.server.fixtures[key] = content
+        polls = team.watch_scoreboard(interval=0, max_polls=3)
+        self.assertEqual(len(self.run_async(polls.__anext__())), NUM_TEAMS)
+        self.server.fixtures[key] = content.replace(b'>67.3<', b'>70.3<')
+        self.assertEqual(self.run_async(polls.__anext__()),
+                         [{'matchup': 0,
+                           'name': 'Team 1',
+                           'changes': {'score': '70.3'}}])
+        # Third poll: not modified, nothing yielded
+        with self.assertRaises(StopAsyncIteration):
+            self.run_async(polls.__anext__())
+
+
+@unittest.skipIf(columnar.numpy is None, "Columnar snapshots need numpy")
+class TestColumnar(unittest.TestCase):
+
+    HEADER_ROW = ['name', 'team', 'pos', 'status', 'prk', 'pts', 'oprk']
+
+    ROWS = [
+        # Typed
+        ['Tom Brady*', 'NE', 'QB', 'OK', 1, 22.5, 28],
+        # Missing values
+        ['Jets D/ST', 'NYJ', 'D/ST', None, None, None, None],
+        # Untyped, as CSV rows have them
+        ['Mike Williams', 'SD', 'WR', 'Q', '3', '--', '4th'],
+    ]
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.filename = os.path.join(directory, 'players.npz')
+        columnar.write_snapshot(self.filename, self.HEADER_ROW, self.ROWS)
+
+    def test_round_trip(self):
+        with columnar.Snapshot(self.filename) as snapshot:
+            self.assertEqual(snapshot.columns, self.HEADER_ROW)
+            self.assertEqual(snapshot.keys, ['Tom Brady|NE|QB',
+                                             'Jets D/ST|NYJ|D/ST',
+                                             'Mike Williams|SD|WR'])
+            self.assertEqual(snapshot.column_types['status'], 'str')
+            self.assertEqual(snapshot.column_types['prk'], 'int')
+            self.assertEqual(snapshot.column_types['pts'], 'float')
+            self.assertEqual(snapshot.get_column('status'), ['OK', None, 'Q'])
+            self.assertEqual(snapshot.get_column('prk'), [1, None, 3])
+            self.assertEqual(snapshot.get_column('pts'), [22.5, None, None])
+            self.assertEqual(snapshot.get_column('oprk'), [28, None, 4])
+            # Missing values are stored as NaN / -1
+            pts = snapshot.get_array('pts')
+            self.assertTrue(pts[1] != pts[1])
+            self.assertEqual(snapshot.get_array('status')[1],
+                             columnar.MISSING_CODE)
+
+    def test_read_column(self):
+        self.assertEqual(columnar.read_column(self.filename, 'prk'),
+                         {'Tom Brady|NE|QB': 1,
+                          'Jets D/ST|NYJ|D/ST': None,
+                          'Mike Williams|SD|WR': 3})
+
+
+class TestDelta(unittest.TestCase):
+
+    HEADER_ROW = ['name', 'team', 'pos', 'pts']
+
+    SNAPSHOTS = (
+        ('players-2016-09-01.csv', [['Tom Brady', 'NE', 'QB', '20'],
+                                    ['Mike Williams', 'SD', 'WR', '7'],
+                                    ['Mike Williams', 'TB', 'WR', '9'],
+                                    ['Jets D/ST', 'NYJ', 'D/ST', '4']]),
+        # Re-ranked, one update, one insert
+        ('players-2016-09-02.csv', [['Mike Williams', 'TB', 'WR', '9'],
+                                    ['Odell Beckham Jr.', 'NYG', 'WR', '11'],
+                                    ['Tom Brady', 'NE', 'QB', '22'],
+                                    ['Mike Williams', 'SD', 'WR', '7'],
+                                    ['Jets D/ST', 'NYJ', 'D/ST', '4']]),
+        # One delete, one move to the end, one insert at the top
+        ('players-2016-09-03.csv', [['Rex Burkhead', 'Cin', 'RB', '5'],
+                                    ['Odell Beckham Jr.', 'NYG', 'WR', '11'],
+                                    ['Tom Brady', 'NE', 'QB', '22'],
+                                    ['Jets D/ST', 'NYJ', 'D/ST', '4'],
+                                    ['Mike Williams', 'TB', 'WR', '9']]),
+    )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_snapshot(self, basename, rows):
+        filename = os.path.join(self.directory, basename)
+        with open(filename, 'w') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(self.HEADER_ROW)
+            writer.writerows(rows)
+        return filename
+
+    def test_round_trip(self):
+        previous_filename = None
+        for basename, rows in self.SNAPSHOTS:
+            filename = self.write_snapshot(basename, rows)
+            if previous_filename is not None:
+                delta_filename = filename[:-len(delta.EXT_KEYFRAME)] + \
+                    delta.EXT_DELTA
+                self.assertTrue(delta.make_delta(previous_filename, filename,
+                                                 delta_filename))
+                os.remove(filename)
+                filename = delta_filename
+            previous_filename = filename
+        chain = delta.get_chain(self.directory)
+        self.assertEqual([delta.is_delta(filename) for filename in chain],
+                         [False, True, True])
+        for filename, (basename, rows) in zip(chain, self.SNAPSHOTS):
+            header_row, reconstructed = delta.reconstruct(filename)
+            self.assertEqual(header_row, self.HEADER_ROW)
+            # Same rows, in the same order
+            self.assertEqual(list(reconstructed.values()), rows)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    URL = 'http://games.espn.com/ffl/clubhouse'
+
+    def test_parse_retry_after(self):
+        self.assertEqual(ratelimit.parse_retry_after('3'), 3.0)
+        self.assertIsNone(ratelimit.parse_retry_after(''))
+        self.assertIsNone(ratelimit.parse_retry_after('soon'))
+        value = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(ratelimit.parse_retry_after(value), 30,
+                               delta=2)
+        value = email.utils.formatdate(time.time() - 30, usegmt=True)
+        self.assertEqual(ratelimit.parse_retry_after(value), 0.0)
+
+    def test_adaptive_rate(self):
+        limiter = RateLimiter(rate=10)
+        limiter.on_response(self.URL, 429)
+        self.assertEqual(limiter.rate, 5)
+        limiter.on_response(self.URL, 503, attempt=1)
+        self.assertEqual(limiter.rate, 2.5)
+        # Each success wins back 5% of the configured rate
+        self.assertIsNone(limiter.on_response(self.URL, 200))
+        self.assertEqual(limiter.rate, 3)
+        for _ in range(20):
+            limiter.on_response(self.URL, 200)
+        self.assertEqual(limiter.rate, 10)
+
+    def test_max_retries(self):
+        limiter = RateLimiter(max_retries=2, backoff_factor=1)
+        self.assertEqual(limiter.on_response(self.URL, 500, attempt=0), 1)
+        self.assertEqual(limiter.on_response(self.URL, 500, attempt=1), 2)
+        with self.assertRaises(FetchError):
+            limiter.on_response(self.URL, 500, attempt=2)
+        # Final, left to `raise_for_status()`
+        self.assertIsNone(limiter.on_response(self.URL, 404))
+
+    def test_retry_after_capped(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.on_response(self.URL, 429, '86400'),
+                         ratelimit.MAX_RETRY_AFTER)
+        self.assertLessEqual(limiter.reserve(), ratelimit.MAX_RETRY_AFTER)
+
+
+class TestPlayerStore(unittest.TestCase):
+
+    HEADER_ROW = ['name', 'team', 'pos', 'pts']
 
+    def setUp(self):
+        self.store = PlayerStore(':memory:')
+        self.addCleanup(self.store.close)
+        self.store.add_snapshot('2016-09-01 12:00:00', self.HEADER_ROW, [
+            ['Mike Williams*', 'SD', 'WR', '7'],
+            ['Mike Williams', 'TB', 'WR', '9'],
+            ['Tom Brady', 'NE', 'QB', '--'],
+        ])
+        self.store.add_snapshot('2016-09-08 12:00:00', self.HEADER_ROW, [
+            ['Mike Williams', 'SD', 'WR', '19'],
+            ['Mike Williams', 'TB', 'WR', '6'],
+            ['Tom Brady', 'NE', 'QB', '22'],
+        ])
 
-class TestBasic(unittest.TestCase):
+    def test_history(self):
+        self.assertEqual(self.store.history('Mike Williams', 'pts',
+                                            team='SD', pos='WR'),
+                         [('2016-09-01 12:00:00', 'SD', 'WR', 7),
+                          ('2016-09-08 12:00:00', 'SD', 'WR', 19)])
+        # Without a team both show up, told apart by their team column
+        self.assertEqual(sorted(self.store.history('Mike Williams*', 'pts',
+                                                   start='2016-09-08')),
+                         [('2016-09-08 12:00:00', 'SD', 'WR', 19),
+                          ('2016-09-08 12:00:00', 'TB', 'WR', 6)])
 
-    def test_espn(self):
-        team = ESPNFantasyFootballTeam(settings.ESPN_API_KEY,
-                                       settings.LEAGUE_ID,
-                                       settings.TEAM_ID,
-                                       settings.SEASON_ID)
-        self.assertGreater(len(team.players), 1)
+    def test_top_movers(self):
+        movers = self.store.top_movers('pts', datetime.timedelta(days=7))
+        # Tom Brady had no points to change from
+        self.assertEqual(movers, [('Mike Williams', 'SD', 'WR', 7, 19, 12),
+                                  ('Mike Williams', 'TB', 'WR', 9, 6, -3)])
 
 
 if __name__ == '__main__':
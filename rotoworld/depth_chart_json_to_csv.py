@@ -42,7 +42,7 @@ def parse_json(data):
 
 def main():
     if len(sys.argv) < 2:
-        print "Usage: ./depth_chart_json_to_csv.py <filename.json>"
+        print("Usage: ./depth_chart_json_to_csv.py <filename.json>")
         exit(1)
     filename = sys.argv[1]
     with open(filename, 'r') as fp:
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+"""Download Rotoworld's depth charts into one `depth_charts.csv`
+
+The in-process version of `depth_charts.sh`: every division is fetched
+(a few at a time, with at least `--delay` seconds between requests), its
+`#cp1_tblDepthCharts` table converted to the same JSON `pup` produces and
+run through `depth_chart_json_to_csv.parse_json()`, and the rows streamed to
+the CSV in division order - no intermediate HTML/JSON/CSV files.
+
+Usage:
+
+    ./depth_charts.py [--output depth_charts.csv] [--concurrency N] [--delay S]
+"""
+
+import argparse
+import csv
+import logging
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+import time
+
+from bs4 import BeautifulSoup, Comment, NavigableString
+import requests
+
+from depth_chart_json_to_csv import parse_json
+
+
+URL = 'http://www.rotoworld.com/teams/depth-charts/nfl.aspx'
+
+# See `download_depth_charts.sh` for where these come from
+VIEW_STATE = '/wEPDwUKMTY5MDM3Mjg4MQ9kFgJmD2QWBAIBD2QWBAIKDxYCHgRUZXh0BVQ8bGluayByZWw9ImNhbm9uaWNhbCIgaHJlZj0iaHR0cDovL3d3dy5yb3Rvd29ybGQuY29tL3RlYW1zL2RlcHRoLWNoYXJ0cy9uZmwuYXNweCIgLz5kAiAPFgIfAAViPHNjcmlwdCBsYW5ndWFnZT0namF2YXNjcmlwdCcgdHlwZT0ndGV4dC9qYXZhc2NyaXB0JyBzcmM9Jy96bGlicy9mbHlvdXRuYXZfdjA5MDQyMDEzLmpzJz48L3NjcmlwdD5kAgMPZBYCAgMPZBYEAgMPZBYEAgMPEGRkFgFmZAILD2QWAmYPZBYIZg8PZBYCHgVzdHlsZQUYYmFja2dyb3VuZC1jb2xvcjojMTk0QjhDFgJmDw8WBB4LTmF2aWdhdGVVcmwFHC90ZWFtcy9uZmwvYnVmL2J1ZmZhbG8tYmlsbHMfAAUNQnVmZmFsbyBCaWxsc2RkAgEPD2QWAh8BBRhiYWNrZ3JvdW5kLWNvbG9yOiMwMDc4ODMWAmYPDxYEHwIFHS90ZWFtcy9uZmwvbWlhL21pYW1pLWRvbHBoaW5zHwAFDk1pYW1pIERvbHBoaW5zZGQCAg8PZBYCHwEFGGJhY2tncm91bmQtY29sb3I6IzI0M0U4MhYCZg8PFgQfAgUiL3RlYW1zL25mbC9uZS9uZXctZW5nbGFuZC1wYXRyaW90cx8ABRROZXcgRW5nbGFuZCBQYXRyaW90c2RkAgMPD2QWAh8BBRhiYWNrZ3JvdW5kLWNvbG9yOiMxNjQ1MkQWAmYPDxYEHwIFHC90ZWFtcy9uZmwvbnlqL25ldy15b3JrLWpldHMfAAUNTmV3IFlvcmsgSmV0c2RkAgUPZBYCAgMPZBYGAgEPFgIfAAUNTkZMIEhlYWRsaW5lc2QCAg8PFgIfAgUkfi9oZWFkbGluZXMvbmZsLzAvRm9vdGJhbGwtaGVhZGxpbmVzZGQCBA8PZA8QFgFmFgEWAh4OUGFyYW1ldGVyVmFsdWUFA25mbBYBZmRkZO2Dt9M52EuENdgn+JZ3xBHinSck'
+EVENT_VALIDATION = '/wEWEQL5vN6ODQKHlvL3BgLA+sClCQK5vLryBgKR7bOpAwLOgqXZDwLOgoHZDwLOgu3ZDwLOgv3ZDwLzgqXZDwLzgoHZDwLzgu3ZDwLzgv3ZDwKryO7wDQLU2Yn4DgKVk5vgDAK//t/aB027cmz3JEV3i6kEyk3oQl6vVZaJ'
+DIVISION_VAR = 'ctl00$cp1$ddlDivisions'
+
+# "AE" is the default (a plain GET), the others are POSTs
+DIVISIONS = ('AE', 'AN', 'AS', 'AW', 'NN', 'NS', 'NE', 'NW')
+DEFAULT_DIVISION = 'AE'
+
+TABLE_ID = 'cp1_tblDepthCharts'
+HEADER_ROW = ('team', 'name', 'position', 'depth')
+
+DEFAULT_CONCURRENCY = 2
+# Seconds between the starts of two requests
+DEFAULT_DELAY = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class Politeness(object):
+    """Spaces requests out by at least `delay` seconds, across threads
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_request_at = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            wait = self.next_request_at - now
+            self.next_request_at = max(now, self.next_request_at) + self.delay
+        if wait > 0:
+            time.sleep(wait)
+
+
+def fetch_division(session, politeness, division):
+    politeness.wait()
+    logger.info("Downloading division \"%s\" ...", division)
+    if division == DEFAULT_DIVISION:
+        response = session.get(URL)
+    else:
+        # Multipart, like `curl -F`
+        fields = {
+            '__VIEWSTATE': VIEW_STATE,
+            '__EVENTVALIDATION': EVENT_VALIDATION,
+            DIVISION_VAR: division,
+        }
+        response = session.post(URL, files=dict((key, (None, value))
+                                                for key, value in fields.items()))
+    response.raise_for_status()
+    return response.content
+
+
+def element_to_json(element):
+    """`element` the way `pup 'json{}'` renders it: its attributes, `tag`,
+    its own text (`text`) and its child elements (`children`)
+    """
+    result = {}
+    for key, value in element.attrs.items():
+        if isinstance(value, list):
+            value = ' '.join(value)
+        result[key] = value
+    result['tag'] = element.name
+    texts = []
+    children = []
+    for child in element.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            text = child.strip()
+            if text:
+                texts.append(text)
+        else:
+            children.append(element_to_json(child))
+    if texts:
+        result['text'] = ' '.join(texts)
+    if children:
+        result['children'] = children
+    return result
+
+
+def parse_division(content):
+    """`(team, name, position, depth)` rows for a division's page
+    """
+    # html5lib, like pup, adds the <tbody>s `parse_json()` expects
+    soup = BeautifulSoup(content, 'html5lib')
+    table = soup.find(id=TABLE_ID)
+    if table is None:
+        raise ValueError("No #%s on the page" % TABLE_ID)
+    return parse_json(element_to_json(table))
+
+
+def download_division(task):
+    session, politeness, division = task
+    rows = parse_division(fetch_division(session, politeness, division))
+    logger.info("Division \"%s\": %s players", division, len(rows))
+    return rows
+
+
+def _encode(row):
+    if str is bytes:
+        # Python 2's csv module wants bytes
+        return [value.encode('utf-8') for value in row]
+    return row
+
+
+def write_depth_charts(filename, divisions=DIVISIONS,
+                       concurrency=DEFAULT_CONCURRENCY, delay=DEFAULT_DELAY):
+    session = requests.Session()
+    politeness = Politeness(delay)
+    pool = ThreadPool(concurrency)
+    partial_filename = '%s.part' % filename
+    num_rows = 0
+    try:
+        with open(partial_filename, 'w') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(HEADER_ROW)
+            tasks = [(session, politeness, division) for division in divisions]
+            for rows in pool.imap(download_division, tasks):
+                for row in rows:
+                    writer.writerow(_encode(row))
+                num_rows += len(rows)
+    except:
+        os.remove(partial_filename)
+        raise
+    finally:
+        pool.terminate()
+    os.rename(partial_filename, filename)
+    logger.info("Wrote %s players to %s", num_rows, filename)
+    return num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', default='depth_charts.csv')
+    parser.add_argument('--concurrency', type=int,
+                        default=DEFAULT_CONCURRENCY,
+                        help="Divisions downloaded at once")
+    parser.add_argument('--delay', type=float, default=DEFAULT_DELAY,
+                        help="Seconds between requests")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    write_depth_charts(args.output,
+                       concurrency=args.concurrency,
+                       delay=args.delay)
+
+
+if __name__ == '__main__':
+    main()
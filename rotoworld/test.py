@@ -0,0 +1,139 @@
+"""Tests for `depth_charts.py`'s conversion of a division's page
+
+Run from this folder:
+
+    python -m unittest test
+"""
+
+import unittest
+
+import depth_charts
+from depth_chart_json_to_csv import parse_json
+
+
+# A trimmed down division: two teams, with a position spanning two rows and
+# no <tbody>s (the browser - and pup - add those)
+HTML = """<html><body>
+<table id="cp1_tblDepthCharts" class="depthChart wide">
+  <tr>
+    <td><a href="/teams/nfl/buf/buffalo-bills">Buffalo Bills</a></td>
+    <td><a href="/teams/nfl/mia/miami-dolphins">Miami Dolphins</a></td>
+  </tr>
+  <tr>
+    <td>
+      <table>
+        <tr><td><b>QB</b></td><td>1. <a href="/player/1">Tyrod Taylor</a></td></tr>
+        <tr><td><b>RB</b></td><td>1. <a href="/player/2">LeSean McCoy</a></td></tr>
+        <tr><td></td><td>2. <a href="/player/3">Mike Gillislee</a></td></tr>
+      </table>
+    </td>
+    <td>
+      <!-- Updated daily -->
+      <table>
+        <tr><td><b>QB</b></td><td>1. <a href="/player/4">Ryan Tannehill</a></td></tr>
+      </table>
+    </td>
+  </tr>
+</table>
+</body></html>
+"""
+
+
+def player_row_json(depth, href, name, position=None):
+    position_cell = {'tag': 'td'}
+    if position:
+        position_cell['children'] = [{'tag': 'b', 'text': position}]
+    return {
+        'tag': 'tr',
+        'children': [
+            position_cell,
+            {
+                'tag': 'td',
+                'text': depth,
+                'children': [{'tag': 'a', 'href': href, 'text': name}],
+            },
+        ],
+    }
+
+
+def team_players_json(rows):
+    return {
+        'tag': 'td',
+        'children': [{
+            'tag': 'table',
+            'children': [{'tag': 'tbody', 'children': rows}],
+        }],
+    }
+
+
+# `pup '#cp1_tblDepthCharts json{}'` of the table above
+PUP_JSON = {
+    'tag': 'table',
+    'id': 'cp1_tblDepthCharts',
+    'class': 'depthChart wide',
+    'children': [{
+        'tag': 'tbody',
+        'children': [
+            {
+                'tag': 'tr',
+                'children': [
+                    {
+                        'tag': 'td',
+                        'children': [{'tag': 'a',
+                                      'href': '/teams/nfl/buf/buffalo-bills',
+                                      'text': 'Buffalo Bills'}],
+                    },
+                    {
+                        'tag': 'td',
+                        'children': [{'tag': 'a',
+                                      'href': '/teams/nfl/mia/miami-dolphins',
+                                      'text': 'Miami Dolphins'}],
+                    },
+                ],
+            },
+            {
+                'tag': 'tr',
+                'children': [
+                    team_players_json([
+                        player_row_json('1.', '/player/1', 'Tyrod Taylor',
+                                        'QB'),
+                        player_row_json('1.', '/player/2', 'LeSean McCoy',
+                                        'RB'),
+                        player_row_json('2.', '/player/3', 'Mike Gillislee'),
+                    ]),
+                    team_players_json([
+                        player_row_json('1.', '/player/4', 'Ryan Tannehill',
+                                        'QB'),
+                    ]),
+                ],
+            },
+        ],
+    }],
+}
+
+ROWS = [
+    ('Buffalo Bills', 'Tyrod Taylor', 'QB', '1'),
+    ('Buffalo Bills', 'LeSean McCoy', 'RB', '1'),
+    ('Buffalo Bills', 'Mike Gillislee', 'RB', '2'),
+    ('Miami Dolphins', 'Ryan Tannehill', 'QB', '1'),
+]
+
+
+class TestDepthCharts(unittest.TestCase):
+
+    def test_element_to_json(self):
+        soup = depth_charts.BeautifulSoup(HTML, 'html5lib')
+        table = soup.find(id=depth_charts.TABLE_ID)
+        self.assertEqual(depth_charts.element_to_json(table), PUP_JSON)
+
+    def test_parse_division(self):
+        self.assertEqual(parse_json(PUP_JSON), ROWS)
+        self.assertEqual(depth_charts.parse_division(HTML), ROWS)
+
+    def test_parse_division_missing_table(self):
+        with self.assertRaises(ValueError):
+            depth_charts.parse_division('<html><body></body></html>')
+
+
+if __name__ == '__main__':
+    unittest.main()